@@ -2,16 +2,25 @@ import streamlit as st
 import os
 import uuid
 import json
+import asyncio
 
 from config import (
-    FAISS_INDEX_PATH,
-    METADATA_PATH,
     UPLOAD_DIR,
-    SESSION_DIR
+    SESSION_DIR,
+    COLLECTION_NAME,
+    MAX_UPLOAD_MB,
+    FAISS_WARM_UP
 )
 
-from core.pdf_ingestion import pdf_pipeline
-from core.rag_pipeline import rag_pipeline
+from core.pdf_ingestion import upload_pipeline
+from core.rag_pipeline import rag_pipeline, get_chunk_content
+from core.collection_manager import (
+    collection_version,
+    list_collections,
+    validate_collection_name,
+    warm_up_collection
+)
+from core.single_flight import coalescing_stats
 
 
 # =====================================================
@@ -26,6 +35,9 @@ st.set_page_config(
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(SESSION_DIR, exist_ok=True)
 
+# Chat turns rendered per page; older turns sit behind "Show earlier"
+CHAT_PAGE_SIZE = 10
+
 
 # =====================================================
 # SESSION INIT
@@ -37,6 +49,9 @@ if "session_id" not in st.session_state:
 if "chat_history" not in st.session_state:
     st.session_state.chat_history = []
 
+if "visible_turns" not in st.session_state:
+    st.session_state.visible_turns = CHAT_PAGE_SIZE
+
 
 # =====================================================
 # HEADER
@@ -49,6 +64,55 @@ st.caption(f"🆔 Session ID: `{st.session_state.session_id}`")
 st.divider()
 
 
+# =====================================================
+# COLLECTION
+# =====================================================
+
+# Loaded indexes live in a process-level LRU (core.collection_manager),
+# so switching collections or rerunning does not reload from disk
+NEW_COLLECTION = "➕ New collection..."
+
+with st.sidebar:
+
+    st.subheader("🗂 Collection")
+
+    existing = list_collections() or [COLLECTION_NAME]
+
+    choice = st.selectbox("Collection", existing + [NEW_COLLECTION])
+
+    if choice == NEW_COLLECTION:
+        choice = st.text_input("New collection name", value="").strip()
+
+try:
+    collection = validate_collection_name(choice)
+except ValueError as e:
+    st.warning(str(e))
+    st.stop()
+
+
+# Runs once per process and index version, not on every rerun
+@st.cache_resource(show_spinner="Loading index...")
+def warm_up(name, version):
+
+    warm_up_collection(name)
+
+
+if FAISS_WARM_UP and collection_version(collection) is not None:
+    warm_up(collection, collection_version(collection))
+
+
+# Process-wide: identical concurrent requests that shared one execution
+with st.sidebar:
+
+    with st.expander("⚡ Coalesced requests"):
+
+        for name, stats in coalescing_stats().items():
+            st.caption(
+                f"{name}: {stats['coalesced']} of {stats['calls']} calls shared "
+                f"({stats['executions']} executed)"
+            )
+
+
 # =====================================================
 # PDF UPLOAD
 # =====================================================
@@ -56,7 +120,7 @@ st.divider()
 st.subheader("📤 Upload PDF")
 
 uploaded_file = st.file_uploader(
-    "Choose a PDF file (Max 10MB)",
+    f"Choose a PDF file (Max {MAX_UPLOAD_MB}MB)",
     type=["pdf"]
 )
 
@@ -66,29 +130,27 @@ if st.button("Upload & Index", use_container_width=True):
         st.warning("Please upload a PDF first.")
     else:
 
-        if uploaded_file.size > 10 * 1024 * 1024:
-            st.error("File exceeds 10MB limit.")
+        if uploaded_file.size > MAX_UPLOAD_MB * 1024 * 1024:
+            st.error(f"File exceeds {MAX_UPLOAD_MB}MB limit.")
             st.stop()
 
-        file_path = os.path.join(UPLOAD_DIR, uploaded_file.name)
-
         print("📥 Upload detected:", uploaded_file.name)
 
         with st.spinner("Processing and indexing..."):
 
-            # Save file
-            with open(file_path, "wb") as f:
-                f.write(uploaded_file.read())
-
-            print("💾 File saved:", file_path)
+            # Streams to uploads/<sha256>.pdf and skips already-indexed bytes
+            uploaded_file.seek(0)
 
-            # Ingest
-            chunk_count = pdf_pipeline(file_path)
+            result = upload_pipeline(uploaded_file, uploaded_file.name, collection)
 
-            print("🧠 Chunks added:", chunk_count)
+            print("🧠 Chunks:", result["chunks"])
 
-        st.success(f"{uploaded_file.name} indexed successfully")
-        st.info(f"Chunks Added: {chunk_count}")
+        if result["duplicate"]:
+            st.success(f"{uploaded_file.name} is already indexed in '{collection}'")
+            st.info(f"Existing Chunks: {result['chunks']}")
+        else:
+            st.success(f"{uploaded_file.name} indexed into '{collection}'")
+            st.info(f"Chunks Added: {result['chunks']}")
 
 st.divider()
 
@@ -110,29 +172,39 @@ if query:
     })
 
     # Guard: Check index existence
-    if not os.path.exists(FAISS_INDEX_PATH) or not os.path.exists(METADATA_PATH):
+    if collection_version(collection) is None:
 
-        response_text = "No documents indexed. Please upload a PDF first."
+        response_text = f"No documents indexed in '{collection}'. Please upload a PDF first."
         citations = []
 
     else:
 
         with st.spinner("Thinking..."):
 
-            result = rag_pipeline(
-                user_query=query,
-                session_id=st.session_state.session_id,
-                top_k=3
-            )
+            try:
+                result = rag_pipeline(
+                    user_query=query,
+                    session_id=st.session_state.session_id,
+                    top_k=3,
+                    collection=collection
+                )
+            except asyncio.TimeoutError:
+                result = {
+                    "answer": "The request timed out. Please try again.",
+                    "citations": []
+                }
 
         response_text = result["answer"]
         citations = result.get("citations", [])
 
-    # Add assistant message to UI
+    # Add assistant message to UI (citation bodies are loaded on demand)
     st.session_state.chat_history.append({
         "role": "assistant",
         "content": response_text,
-        "citations": citations
+        "citations": [
+            {key: value for key, value in cite.items() if key != "content"}
+            for cite in citations
+        ]
     })
 
     # ==========================================
@@ -174,7 +246,20 @@ if query:
 # DISPLAY CHAT
 # =====================================================
 
-for msg_index, msg in enumerate(st.session_state.chat_history):
+chat_history = st.session_state.chat_history
+
+# Each turn is a user + assistant message
+first_visible = max(0, len(chat_history) - 2 * st.session_state.visible_turns)
+
+if first_visible > 0:
+
+    if st.button(f"Show earlier messages ({first_visible // 2} hidden)"):
+        st.session_state.visible_turns += CHAT_PAGE_SIZE
+        st.rerun()
+
+for msg_index in range(first_visible, len(chat_history)):
+
+    msg = chat_history[msg_index]
 
     with st.chat_message(msg["role"]):
 
@@ -193,23 +278,19 @@ for msg_index, msg in enumerate(st.session_state.chat_history):
                         f"{cite['file']} | Page {cite['page']} | Chunk {cite['chunk_no']}"
                     ):
 
-                        content = cite["content"]
-
-                        preview_len = 300
-                        preview = (
-                            content[:preview_len] + "..."
-                            if len(content) > preview_len
-                            else content
-                        )
-
-                        st.markdown(preview)
-
                         checkbox_key = (
                             f"{st.session_state.session_id}_{msg_index}_{cite_index}"
                         )
 
-                        if st.checkbox("Show full content", key=checkbox_key):
-                            st.markdown(content)
+                        # Fetch the chunk body only when asked for
+                        if st.checkbox("Show content", key=checkbox_key):
+
+                            if collection_version(cite["collection"]) is None:
+                                st.info("Index is no longer available.")
+                            else:
+                                st.markdown(get_chunk_content(
+                                    cite["chunk_id"], cite["collection"]
+                                ))
 
             else:
-                st.info("No sources found.")
\ No newline at end of file
+                st.info("No sources found.")
@@ -0,0 +1,191 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+import faiss
+import numpy as np
+
+from core.sharded_index import read_index
+from core.collection_manager import prefault_file
+
+
+# =====================================================
+# FAISS LOAD BENCHMARK
+# =====================================================
+#
+# Compares the default load path (faiss.read_index, private copy per
+# process) with the read-only memory-mapped path (FAISS_MMAP=true) by
+# starting N worker processes per mode and measuring startup time and
+# memory while all of them hold the index at once:
+#
+#   python -m benchmarks.bench_faiss_load --index data/faiss.index --workers 4
+#   python -m benchmarks.bench_faiss_load --synthetic 500000 --dim 768 --workers 4
+#
+# Memory figures come from /proc (Linux only). PSS splits shared pages
+# between the processes mapping them, so total PSS is the real host cost.
+
+MODES = ("read", "mmap")
+
+
+def memory_stats():
+
+    stats = {}
+
+    with open("/proc/self/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "RssAnon", "RssFile"):
+                stats[key] = int(value.split()[0]) / 1024
+
+    if os.path.exists("/proc/self/smaps_rollup"):
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    stats["Pss"] = int(line.split()[1]) / 1024
+
+    return stats
+
+
+# =====================================================
+# CHILD: LOAD, WARM, WAIT, MEASURE
+# =====================================================
+
+def run_child(index_path: str, mode: str, warm: bool):
+
+    start = time.perf_counter()
+
+    index = read_index(index_path, mmap=(mode == "mmap"))
+
+    load_s = time.perf_counter() - start
+
+    warm_s = 0.0
+
+    if warm:
+        start = time.perf_counter()
+        prefault_file(index_path)
+        index.search(np.zeros((1, index.d), dtype="float32"), 1)
+        warm_s = time.perf_counter() - start
+
+    # Hold the index until every worker has loaded, then measure together
+    print("ready", flush=True)
+    sys.stdin.readline()
+
+    result = {"load_s": load_s, "warm_s": warm_s}
+    result.update(memory_stats())
+
+    print(json.dumps(result), flush=True)
+
+
+# =====================================================
+# PARENT
+# =====================================================
+
+def run_mode(index_path: str, mode: str, workers: int, warm: bool):
+
+    command = [
+        sys.executable, "-m", "benchmarks.bench_faiss_load",
+        "--child", mode, "--index", index_path
+    ]
+
+    if not warm:
+        command.append("--no-warm")
+
+    procs = [
+        subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        for _ in range(workers)
+    ]
+
+    for proc in procs:
+        if proc.stdout.readline().strip() != "ready":
+            raise RuntimeError(f"{mode} worker failed to start")
+
+    for proc in procs:
+        proc.stdin.write("\n")
+        proc.stdin.flush()
+
+    results = [json.loads(proc.stdout.readline()) for proc in procs]
+
+    for proc in procs:
+        proc.wait()
+
+    def avg(key):
+        return sum(r.get(key, 0.0) for r in results) / len(results)
+
+    return {
+        "mode": mode,
+        "load_ms": round(avg("load_s") * 1000, 1),
+        "warm_ms": round(avg("warm_s") * 1000, 1),
+        "rss_mb": round(avg("VmRSS"), 1),
+        "rss_anon_mb": round(avg("RssAnon"), 1),
+        "rss_file_mb": round(avg("RssFile"), 1),
+        "total_pss_mb": round(sum(r.get("Pss", 0.0) for r in results), 1)
+    }
+
+
+def build_synthetic(count: int, dim: int) -> str:
+
+    print(f"📦 Building synthetic index: {count} x {dim}...")
+
+    index = faiss.IndexFlatL2(dim)
+
+    rng = np.random.default_rng(0)
+
+    for start in range(0, count, 50_000):
+        n = min(50_000, count - start)
+        index.add(rng.standard_normal((n, dim), dtype=np.float32))
+
+    path = os.path.join(tempfile.mkdtemp(prefix="faiss-bench-"), "faiss.index")
+
+    faiss.write_index(index, path)
+
+    return path
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Benchmark FAISS load paths across workers.")
+    parser.add_argument("--index", default="data/faiss.index")
+    parser.add_argument("--synthetic", type=int, default=0,
+                        help="Benchmark a random flat index with this many vectors")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--no-warm", action="store_true")
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+
+    args = parser.parse_args(argv)
+
+    if args.child:
+        run_child(args.index, args.child, not args.no_warm)
+        return 0
+
+    index_path = build_synthetic(args.synthetic, args.dim) if args.synthetic else args.index
+
+    size_mb = os.path.getsize(index_path) / 1024 / 1024
+
+    print(f"📊 {index_path} ({size_mb:.1f} MB) | {args.workers} workers\n")
+
+    # Same starting point for both modes: index file in the page cache
+    prefault_file(index_path)
+
+    try:
+        rows = [run_mode(index_path, mode, args.workers, not args.no_warm) for mode in MODES]
+    finally:
+        if args.synthetic:
+            shutil.rmtree(os.path.dirname(index_path))
+
+    columns = list(rows[0].keys())
+
+    print(" | ".join(f"{c:>12}" for c in columns))
+
+    for row in rows:
+        print(" | ".join(f"{str(row[c]):>12}" for c in columns))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+import os
+import sys
+import time
+import argparse
+import faiss
+import numpy as np
+
+from concurrent.futures import ThreadPoolExecutor
+
+from core.sharded_index import create_index, add_vectors
+
+
+# =====================================================
+# SHARDED SEARCH BENCHMARK
+# =====================================================
+#
+# Builds a random flat index once per shard count and measures single-query
+# latency and concurrent throughput as search threads go from 1 to the
+# machine's core count:
+#
+#   python -m benchmarks.bench_sharded_search --vectors 500000 --dim 768
+#   python -m benchmarks.bench_sharded_search --shards 1 4 8 --threads 1 2 4 8
+#
+# With one shard, FAISS's own OpenMP threads are the baseline; with N shards
+# a single query fans out to min(N, threads) cores through the search pool.
+
+
+def thread_counts():
+
+    cores = os.cpu_count() or 1
+
+    counts = [1]
+
+    while counts[-1] * 2 <= cores:
+        counts.append(counts[-1] * 2)
+
+    if counts[-1] != cores:
+        counts.append(cores)
+
+    return counts
+
+
+def use_threads(index, num_shards: int, threads: int):
+
+    if num_shards > 1:
+        # One pool thread per core; FAISS itself stays single-threaded so
+        # the shard fan-out is the only source of parallelism
+        index.pool = ThreadPoolExecutor(max_workers=threads)
+        faiss.omp_set_num_threads(1)
+    else:
+        faiss.omp_set_num_threads(threads)
+
+
+def measure(index, queries, top_k: int, clients: int):
+
+    # Latency: one query at a time
+    latencies = []
+
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query[None, :], top_k)
+        latencies.append(time.perf_counter() - start)
+
+    # Throughput: `clients` callers issuing queries concurrently
+    def run(chunk):
+        for query in chunk:
+            index.search(query[None, :], top_k)
+
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        list(executor.map(run, np.array_split(queries, clients)))
+
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array(latencies) * 1000
+
+    return {
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+        "qps": round(len(queries) / elapsed, 1)
+    }
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Benchmark sharded FAISS search scaling.")
+    parser.add_argument("--vectors", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--shards", type=int, nargs="+")
+    parser.add_argument("--threads", type=int, nargs="+")
+
+    args = parser.parse_args(argv)
+
+    threads = args.threads or thread_counts()
+    shards = args.shards or sorted({1, max(threads)})
+
+    rng = np.random.default_rng(0)
+
+    print(f"📦 Building {args.vectors} x {args.dim} vectors...")
+
+    vectors = rng.standard_normal((args.vectors, args.dim), dtype=np.float32)
+    queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+
+    print(f"📊 {os.cpu_count()} cores | {args.queries} queries | top_k={args.top_k}\n")
+
+    columns = ["shards", "threads", "p50_ms", "p95_ms", "qps"]
+
+    print(" | ".join(f"{c:>8}" for c in columns))
+
+    for num_shards in shards:
+
+        index = create_index(args.dim, num_shards)
+
+        add_vectors(index, vectors, None)
+
+        for count in threads:
+
+            use_threads(index, num_shards, count)
+
+            row = {"shards": num_shards, "threads": count}
+            row.update(measure(index, queries, args.top_k, count))
+
+            print(" | ".join(f"{str(row[c]):>8}" for c in columns))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
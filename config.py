@@ -5,16 +5,88 @@ load_dotenv()
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
+# Optional override, e.g. a local fake server for throttling tests
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL")
+
 LLM_MODEL = "gemini-2.5-flash"
 EMBEDDING_MODEL = "models/gemini-embedding-001"
 
-CHROMA_DB_PATH = "data/chroma_db"
+# gemini-embedding-001 supports 768/1536/3072 output dims. This is the
+# dimension of new collections; existing ones keep the one they were
+# built with (change it with: python -m core.migrate_embeddings --dim <n>)
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "3072"))
+
 UPLOAD_DIR = "uploads"
-COLLECTION_NAME = "pdf_documents"
 SESSION_DIR = "session"
+
+# Uploads are streamed to disk, so this can go well past the old 10MB.
+# Above 200MB also raise Streamlit's server.maxUploadSize.
+MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "10"))
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# ==============================
+# MODEL RATE LIMITS
+# ==============================
+
+EMBED_REQUESTS_PER_MIN = float(os.getenv("EMBED_REQUESTS_PER_MIN", "1500"))
+LLM_REQUESTS_PER_MIN = float(os.getenv("LLM_REQUESTS_PER_MIN", "1000"))
+MODEL_MAX_CONCURRENCY = int(os.getenv("MODEL_MAX_CONCURRENCY", "16"))
+MODEL_MAX_RETRIES = int(os.getenv("MODEL_MAX_RETRIES", "6"))
+
+# End-to-end budget for one question (retrieval + answer)
+RAG_TIMEOUT_SECONDS = float(os.getenv("RAG_TIMEOUT_SECONDS", "90"))
+
 # ==============================
 # FAISS PATHS
 # ==============================
 
-FAISS_INDEX_PATH =  "data/faiss.index"
-METADATA_PATH =  "data/metadata.pkl"
\ No newline at end of file
+DATA_DIR = "data"
+
+FAISS_INDEX_FILE = "faiss.index"
+
+# Open search indexes read-only and memory-mapped, so worker processes
+# on one host share the page cache instead of each holding a copy
+FAISS_MMAP = os.getenv("FAISS_MMAP", "false").lower() == "true"
+
+# Split new indexes into N shards searched in parallel ("hash" spreads
+# chunks evenly, "document" keeps each PDF in one shard). Existing
+# collections are converted with: python -m core.reshard --shards N
+FAISS_NUM_SHARDS = int(os.getenv("FAISS_NUM_SHARDS", "1"))
+FAISS_SHARD_BY = os.getenv("FAISS_SHARD_BY", "hash")
+
+# Threads for parallel shard search (0 = one per CPU)
+FAISS_SEARCH_THREADS = int(os.getenv("FAISS_SEARCH_THREADS", "0"))
+
+# Prefault index + chunk text into memory when a collection is first served
+FAISS_WARM_UP = os.getenv("FAISS_WARM_UP", "true").lower() == "true"
+
+# ==============================
+# CHUNK STORE
+# ==============================
+
+CHUNK_TEXT_FILE = "chunks.bin"
+CHUNK_META_FILE = "chunks_meta.npz"
+CHUNK_FILES_FILE = "files.json"
+
+# Pickled list of dicts used before the chunk store; migrated on first load
+LEGACY_METADATA_FILE = "metadata.pkl"
+
+# sha256 -> {file, chunks} of every document already in a collection
+INGESTED_REGISTRY_FILE = "ingested.json"
+
+# Held (flock) by whichever process is writing to a collection
+COLLECTION_LOCK_FILE = ".write.lock"
+
+# Store each chunk body zlib-compressed when that makes it smaller
+CHUNK_COMPRESSION = os.getenv("CHUNK_COMPRESSION", "true").lower() == "true"
+
+# ==============================
+# COLLECTIONS
+# ==============================
+
+# The default collection lives directly in DATA_DIR, others in COLLECTIONS_DIR/<name>
+COLLECTION_NAME = os.getenv("COLLECTION_NAME", "pdf_documents")
+COLLECTIONS_DIR = f"{DATA_DIR}/collections"
+
+# Memory budget for collections kept loaded in one process
+COLLECTION_CACHE_MAX_MB = int(os.getenv("COLLECTION_CACHE_MAX_MB", "1024"))
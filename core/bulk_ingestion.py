@@ -0,0 +1,431 @@
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from config import COLLECTION_NAME
+from core.collection_manager import (
+    collection_dir,
+    collection_lock,
+    collection_version,
+    collection_dim
+)
+from core.sharded_index import add_vectors
+from core.upload_store import file_digest, load_registry, register_ingested
+from core.pdf_ingestion import (
+    extract_text_from_pdf,
+    overlap_pages,
+    embed_chunks,
+    build_records,
+    load_or_create_faiss,
+    save_faiss
+)
+
+
+# =====================================================
+# CONFIG
+# =====================================================
+
+CHECKPOINT_FILE = "bulk_checkpoint.json"
+
+DEFAULT_WORKERS = 4
+DEFAULT_BATCH_SIZE = 512
+
+
+# =====================================================
+# CHECKPOINT
+# =====================================================
+
+def checkpoint_path_for(collection: str = COLLECTION_NAME) -> str:
+
+    return os.path.join(collection_dir(collection), CHECKPOINT_FILE)
+
+
+def load_checkpoint(path: str):
+
+    if not os.path.exists(path):
+        return {"done": {}, "failed": {}}
+
+    with open(path, "r", encoding="utf-8") as f:
+        checkpoint = json.load(f)
+
+    # Checkpoints written before failed files were recorded
+    checkpoint.setdefault("failed", {})
+
+    return checkpoint
+
+
+def save_checkpoint(checkpoint, path: str):
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    # Write to a temp file first so a crash never leaves half a checkpoint
+    tmp_path = f"{path}.tmp"
+
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f, indent=2, ensure_ascii=False)
+
+    os.replace(tmp_path, path)
+
+
+def file_signature(pdf_path: str):
+
+    stat = os.stat(pdf_path)
+
+    return {"size": stat.st_size, "mtime": int(stat.st_mtime)}
+
+
+# =====================================================
+# DISCOVER PDFs
+# =====================================================
+
+def find_pdfs(root_dir: str):
+
+    pdfs = []
+
+    for dir_path, _, file_names in os.walk(root_dir):
+        for name in file_names:
+            if name.lower().endswith(".pdf"):
+                pdfs.append(os.path.join(dir_path, name))
+
+    return sorted(pdfs)
+
+
+def pending_pdfs(root_dir: str, checkpoint):
+
+    done = checkpoint["done"]
+    failed = checkpoint["failed"]
+
+    pending = []
+
+    for pdf_path in find_pdfs(root_dir):
+
+        key = os.path.relpath(pdf_path, root_dir)
+        entry = done.get(key) or failed.get(key)
+
+        # Skip files already committed, or already found unreadable, with
+        # the same size/mtime; a replaced file is tried again
+        if entry and entry["signature"] == file_signature(pdf_path):
+            continue
+
+        pending.append((key, pdf_path))
+
+    return pending
+
+
+# =====================================================
+# PER-FILE WORK (RUNS IN WORKER THREADS)
+# =====================================================
+
+def safe_digest(pdf_path: str):
+
+    try:
+        return file_digest(pdf_path), None
+    except OSError as e:
+        return None, str(e)
+
+
+def process_pdf(pdf_path: str, dim: int):
+    """
+    Returns (chunks, vectors, error). A file that cannot be read or parsed
+    comes back with an error instead of raising, so it is skipped without
+    stopping the run; embedding errors (quota, retries exhausted) still
+    raise and stop it.
+    """
+
+    try:
+        pages = extract_text_from_pdf(pdf_path)
+    except Exception as e:
+        return None, None, f"{e.__class__.__name__}: {e}"
+
+    chunks = overlap_pages(pages)
+
+    vectors = embed_chunks(chunks, dim) if chunks else []
+
+    return chunks, vectors, None
+
+
+# =====================================================
+# BULK INGEST
+# =====================================================
+
+def bulk_ingest(
+    root_dir: str,
+    workers: int = DEFAULT_WORKERS,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    collection: str = COLLECTION_NAME,
+    checkpoint_path: str = None
+):
+    """
+    Ingests every PDF under root_dir into a collection's FAISS index.
+
+    Files are extracted and embedded in parallel, then committed to the
+    index in batches of at least batch_size chunks. The checkpoint is
+    written after every commit, so re-running resumes after the last
+    committed batch.
+
+    Files that cannot be read or parsed are skipped and recorded as
+    failed in the checkpoint; only model errors or an interrupt stop the
+    run.
+
+    Returns:
+        dict: files, chunks, duplicates, failed, seconds, files_per_sec,
+        chunks_per_sec
+    """
+
+    print("\n=================================================")
+    print("🚀 BULK INGEST STARTED")
+    print(f"📂 {root_dir} → {collection}")
+    print("=================================================\n")
+
+    checkpoint_path = checkpoint_path or checkpoint_path_for(collection)
+
+    checkpoint = load_checkpoint(checkpoint_path)
+
+    pending = pending_pdfs(root_dir, checkpoint)
+
+    print(f"📑 {len(pending)} PDFs to ingest "
+          f"({len(checkpoint['done'])} already done, "
+          f"{len(checkpoint['failed'])} unreadable)\n")
+
+    registry = load_registry(collection)
+
+    index = None
+    store = None
+    saved_version = None
+
+    batch_files = []
+    batch_docs = []
+    batch_size_now = 0
+
+    stats = {"files": 0, "chunks": 0, "duplicates": 0, "failed": 0}
+
+    start = time.perf_counter()
+
+    def commit():
+
+        nonlocal index, store, saved_version, batch_size_now
+
+        if not batch_files:
+            return
+
+        # App uploads may write to the same collection during the run
+        with collection_lock(collection):
+
+            # Drop documents whose bytes were indexed since the run started
+            registry.update(load_registry(collection))
+
+            docs = [doc for doc in batch_docs if doc[0] not in registry]
+
+            for digest, file_name, chunks, vectors in batch_docs:
+                if digest in registry:
+                    print(f"♻️ {file_name} was indexed meanwhile | skipping")
+                    stats["files"] -= 1
+                    stats["chunks"] -= len(chunks)
+                    stats["duplicates"] += 1
+
+            batch_vectors = [v for doc in docs for v in doc[3]]
+
+            if batch_vectors:
+
+                # Keep the loaded index between commits only while nobody
+                # else has saved the collection since our last commit
+                if index is None or collection_version(collection) != saved_version:
+                    index, store = load_or_create_faiss(
+                        len(batch_vectors[0]), collection
+                    )
+
+                for _, file_name, chunks, _ in docs:
+                    store.extend(build_records(chunks, file_name, len(store)))
+
+                file_names = [
+                    file_name for _, file_name, chunks, _ in docs for _ in chunks
+                ]
+
+                add_vectors(index, np.array(batch_vectors), file_names)
+
+                save_faiss(index, store, collection)
+
+                saved_version = collection_version(collection)
+
+            # Registry only after the index is on disk
+            new_digests = {}
+
+            for key, signature, digest, file_name, count in batch_files:
+
+                checkpoint["done"][key] = {"signature": signature, "chunks": count}
+                checkpoint["failed"].pop(key, None)
+
+                # Copies of one document share the first copy's entry
+                if digest not in registry and digest not in new_digests:
+                    new_digests[digest] = {"file": file_name, "chunks": count}
+
+            if new_digests:
+                register_ingested(new_digests, collection)
+                registry.update(new_digests)
+
+        # Checkpoint only after the index is on disk
+        save_checkpoint(checkpoint, checkpoint_path)
+
+        print(f"💾 Committed {len(batch_files)} files | "
+              f"{len(batch_vectors)} chunks")
+
+        batch_files.clear()
+        batch_docs.clear()
+        batch_size_now = 0
+
+    def record_failure(key, pdf_path, error):
+
+        print(f"⚠️ Skipping {key}: {error}")
+
+        # Saved right away: nothing about a failed file waits for a commit
+        checkpoint["failed"][key] = {"signature": file_signature(pdf_path), "error": error}
+        save_checkpoint(checkpoint, checkpoint_path)
+
+        stats["failed"] += 1
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+
+    # Hash everything first, so each distinct document is extracted and
+    # embedded once however many copies of it the tree holds
+    digests = executor.map(safe_digest, [pdf_path for _, pdf_path in pending])
+
+    copies = {}
+
+    for (key, pdf_path), (digest, error) in zip(pending, digests):
+
+        if error is not None:
+            record_failure(key, pdf_path, error)
+            continue
+
+        copies.setdefault(digest, []).append((key, pdf_path))
+
+    # Same bytes already indexed (e.g. uploaded through the app)
+    for digest in [digest for digest in copies if digest in registry]:
+
+        for key, pdf_path in copies.pop(digest):
+
+            batch_files.append((
+                key, file_signature(pdf_path), digest,
+                os.path.basename(pdf_path), registry[digest]["chunks"]
+            ))
+            stats["duplicates"] += 1
+
+    dim = collection_dim(collection)
+
+    futures = {
+        executor.submit(process_pdf, paths[0][1], dim): digest
+        for digest, paths in copies.items()
+    }
+
+    try:
+
+        for future in as_completed(futures):
+
+            # Dropping the future frees its chunks and vectors once they
+            # are batched, so memory tracks the batch, not the corpus
+            digest = futures.pop(future)
+
+            chunks, vectors, error = future.result()
+
+            (key, pdf_path), *duplicates = copies[digest]
+
+            if error is not None:
+
+                # Copies are the same bytes, so they fail the same way
+                for failed_key, failed_path in copies[digest]:
+                    record_failure(failed_key, failed_path, error)
+
+                continue
+
+            file_name = os.path.basename(pdf_path)
+
+            batch_files.append((key, file_signature(pdf_path), digest, file_name, len(chunks)))
+
+            # Identical files elsewhere in the tree are only checkpointed
+            for dup_key, dup_path in duplicates:
+
+                batch_files.append((
+                    dup_key, file_signature(dup_path), digest,
+                    os.path.basename(dup_path), len(chunks)
+                ))
+                stats["duplicates"] += 1
+
+            batch_docs.append((digest, file_name, chunks, vectors))
+            batch_size_now += len(vectors)
+
+            stats["files"] += 1
+            stats["chunks"] += len(chunks)
+
+            if batch_size_now >= batch_size:
+                commit()
+
+        commit()
+
+    except BaseException:
+
+        # Keep everything finished so far, then stop handing out work
+        executor.shutdown(wait=False, cancel_futures=True)
+        commit()
+        print("❌ Bulk ingest interrupted. Re-run to resume.")
+        raise
+
+    executor.shutdown()
+
+    seconds = time.perf_counter() - start
+
+    stats["seconds"] = round(seconds, 2)
+    stats["files_per_sec"] = round(stats["files"] / seconds, 2) if seconds else 0.0
+    stats["chunks_per_sec"] = round(stats["chunks"] / seconds, 2) if seconds else 0.0
+
+    print("=================================================")
+    print(f"🎉 COMPLETED | {stats['files']} files | {stats['chunks']} chunks | "
+          f"{stats['duplicates']} duplicates skipped | {stats['failed']} failed")
+    print(f"⏱  {stats['seconds']}s | "
+          f"{stats['files_per_sec']} files/sec | "
+          f"{stats['chunks_per_sec']} chunks/sec")
+    print("=================================================\n")
+
+    return stats
+
+
+# =====================================================
+# CLI
+# =====================================================
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(
+        description="Bulk-ingest a directory of PDFs into the FAISS index."
+    )
+    parser.add_argument("root_dir", help="Directory to scan for PDFs")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Chunks to buffer before each index commit")
+    parser.add_argument("--collection", default=COLLECTION_NAME)
+    parser.add_argument("--checkpoint", default=None,
+                        help="Defaults to bulk_checkpoint.json in the collection dir")
+
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.root_dir):
+        print(f"❌ Not a directory: {args.root_dir}")
+        return 1
+
+    bulk_ingest(
+        args.root_dir,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        collection=args.collection,
+        checkpoint_path=args.checkpoint
+    )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,317 @@
+import os
+import io
+import json
+import mmap
+import zlib
+import pickle
+import numpy as np
+
+from config import (
+    CHUNK_TEXT_FILE,
+    CHUNK_META_FILE,
+    CHUNK_FILES_FILE,
+    CHUNK_COMPRESSION
+)
+
+
+# =====================================================
+# CHUNK STORE
+# =====================================================
+#
+# On-disk layout (one set per collection directory):
+#
+#   chunks.bin       chunk bodies back to back (UTF-8, zlib when smaller)
+#   chunks_meta.npz  offsets[n+1] int64, file_id/page/chunk_no int32,
+#                    compressed uint8 -- the only arrays kept in RAM
+#   files.json       file_id -> file name
+#
+# chunks.bin is memory-mapped, so a body is only read when a hit needs it.
+
+FLAG_ZLIB = 1
+
+
+class ChunkStore:
+    """
+    Append-only chunk store that behaves like the old metadata list:
+    len(store), store[i] -> {"file", "page", "chunk_no", "content"},
+    store.extend(records). Appended records stay in memory until flush().
+    """
+
+    def __init__(self, directory: str, compress: bool = CHUNK_COMPRESSION):
+
+        self.directory = directory
+        self.compress = compress
+
+        self.text_path = os.path.join(directory, CHUNK_TEXT_FILE)
+        self.meta_path = os.path.join(directory, CHUNK_META_FILE)
+        self.files_path = os.path.join(directory, CHUNK_FILES_FILE)
+
+        self.pending = []
+        self.blob = None
+
+        self.load()
+
+    # -------------------------------------------------
+    # LOAD
+    # -------------------------------------------------
+
+    def load(self):
+
+        if os.path.exists(self.meta_path):
+
+            with np.load(self.meta_path) as arrays:
+                self.offsets = arrays["offsets"]
+                self.file_id = arrays["file_id"]
+                self.page = arrays["page"]
+                self.chunk_no = arrays["chunk_no"]
+                self.flags = arrays["flags"]
+
+            with open(self.files_path, "r", encoding="utf-8") as f:
+                self.files = json.load(f)
+
+        else:
+
+            self.offsets = np.zeros(1, dtype=np.int64)
+            self.file_id = np.zeros(0, dtype=np.int32)
+            self.page = np.zeros(0, dtype=np.int32)
+            self.chunk_no = np.zeros(0, dtype=np.int32)
+            self.flags = np.zeros(0, dtype=np.uint8)
+            self.files = []
+
+        self.file_ids = {name: i for i, name in enumerate(self.files)}
+
+        self.map_text()
+
+    def map_text(self):
+
+        self.blob = None
+
+        # mmap cannot map an empty file
+        if self.offsets[-1] == 0:
+            return
+
+        with open(self.text_path, "rb") as f:
+            self.blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    # -------------------------------------------------
+    # READ
+    # -------------------------------------------------
+
+    def flushed_count(self) -> int:
+
+        return len(self.offsets) - 1
+
+    def __len__(self) -> int:
+
+        return self.flushed_count() + len(self.pending)
+
+    def text(self, i: int) -> str:
+
+        n = self.flushed_count()
+
+        if i >= n:
+            return self.pending[i - n]["content"]
+
+        raw = self.blob[self.offsets[i]:self.offsets[i + 1]]
+
+        if self.flags[i] & FLAG_ZLIB:
+            raw = zlib.decompress(raw)
+
+        return raw.decode("utf-8")
+
+    def file_name(self, i: int) -> str:
+
+        n = self.flushed_count()
+
+        if i >= n:
+            return self.pending[i - n]["file"]
+
+        return self.files[self.file_id[i]]
+
+    def __getitem__(self, i: int):
+
+        if i < 0:
+            i += len(self)
+
+        if not 0 <= i < len(self):
+            raise IndexError(f"chunk {i} out of range")
+
+        n = self.flushed_count()
+
+        if i >= n:
+            return dict(self.pending[i - n])
+
+        return {
+            "file": self.files[self.file_id[i]],
+            "page": int(self.page[i]),
+            "chunk_no": int(self.chunk_no[i]),
+            "content": self.text(i)
+        }
+
+    def resident_nbytes(self) -> int:
+
+        arrays = (
+            self.offsets.nbytes + self.file_id.nbytes + self.page.nbytes
+            + self.chunk_no.nbytes + self.flags.nbytes
+        )
+
+        names = sum(len(name) for name in self.files)
+        pending = sum(len(r["content"]) for r in self.pending)
+
+        return arrays + names + pending
+
+    # -------------------------------------------------
+    # WRITE
+    # -------------------------------------------------
+
+    def extend(self, records):
+
+        self.pending.extend(records)
+
+    def disk_state(self):
+
+        # (chunk count, text bytes) published by the meta file on disk
+        if not os.path.exists(self.meta_path):
+            return 0, 0
+
+        with np.load(self.meta_path) as arrays:
+            offsets = arrays["offsets"]
+
+        return len(offsets) - 1, int(offsets[-1])
+
+    def flush(self):
+        """
+        Appends pending records. Callers hold the collection write lock;
+        if another writer published chunks since this store was loaded,
+        nothing is written and RuntimeError is raised.
+        """
+
+        if not self.pending:
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+
+        end = int(self.offsets[-1])
+
+        if self.disk_state() != (self.flushed_count(), end):
+            raise RuntimeError(
+                f"Chunk store in {self.directory} changed on disk since it was "
+                "loaded; reload it before appending"
+            )
+
+        # Drop any tail left by an append that crashed before its meta
+        # write. `end` is what the meta on disk publishes, so readers
+        # (possibly mmapped) never lose bytes they can see.
+        self.blob = None
+        mode = "r+b" if os.path.exists(self.text_path) else "wb"
+
+        offsets = []
+        flags = []
+
+        with open(self.text_path, mode) as f:
+
+            f.truncate(end)
+            f.seek(end)
+
+            for record in self.pending:
+
+                raw = record["content"].encode("utf-8")
+                flag = 0
+
+                if self.compress:
+                    packed = zlib.compress(raw)
+                    if len(packed) < len(raw):
+                        raw, flag = packed, FLAG_ZLIB
+
+                f.write(raw)
+
+                end += len(raw)
+                offsets.append(end)
+                flags.append(flag)
+
+            f.flush()
+            os.fsync(f.fileno())
+
+        file_ids = []
+
+        for record in self.pending:
+
+            name = record["file"]
+
+            if name not in self.file_ids:
+                self.file_ids[name] = len(self.files)
+                self.files.append(name)
+
+            file_ids.append(self.file_ids[name])
+
+        self.offsets = np.concatenate([self.offsets, np.array(offsets, dtype=np.int64)])
+        self.file_id = np.concatenate([self.file_id, np.array(file_ids, dtype=np.int32)])
+        self.page = np.concatenate([
+            self.page, np.array([r["page"] for r in self.pending], dtype=np.int32)
+        ])
+        self.chunk_no = np.concatenate([
+            self.chunk_no, np.array([r["chunk_no"] for r in self.pending], dtype=np.int32)
+        ])
+        self.flags = np.concatenate([self.flags, np.array(flags, dtype=np.uint8)])
+
+        write_atomic(self.files_path, json.dumps(self.files, ensure_ascii=False).encode("utf-8"))
+
+        # The meta file is written last: it is what makes new chunks visible
+        buffer = io.BytesIO()
+        np.savez(
+            buffer,
+            offsets=self.offsets,
+            file_id=self.file_id,
+            page=self.page,
+            chunk_no=self.chunk_no,
+            flags=self.flags
+        )
+        write_atomic(self.meta_path, buffer.getvalue())
+
+        self.pending = []
+
+        self.map_text()
+
+
+def write_atomic(path: str, data: bytes):
+
+    tmp_path = f"{path}.tmp"
+
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+
+    os.replace(tmp_path, path)
+
+
+# =====================================================
+# LEGACY PICKLE MIGRATION
+# =====================================================
+
+def migrate_pickle(metadata_path: str, directory: str):
+    """
+    Converts a legacy metadata.pkl (list of dicts) into a ChunkStore in
+    directory. The pickle is left in place; it is no longer read.
+    """
+
+    print(f"🔁 Migrating {metadata_path} to chunk store...")
+
+    with open(metadata_path, "rb") as f:
+        metadata = pickle.load(f)
+
+    store = ChunkStore(directory)
+
+    store.extend([
+        {
+            "file": r["file"],
+            "page": r["page"],
+            "chunk_no": r["chunk_no"],
+            "content": r["content"]
+        }
+        for r in metadata
+    ])
+
+    store.flush()
+
+    print(f"✅ Migrated {len(store)} chunks\n")
+
+    return store
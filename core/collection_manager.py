@@ -0,0 +1,383 @@
+import os
+import re
+import time
+import fcntl
+import threading
+import faiss
+import numpy as np
+
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from config import (
+    DATA_DIR,
+    COLLECTIONS_DIR,
+    COLLECTION_NAME,
+    COLLECTION_CACHE_MAX_MB,
+    EMBEDDING_DIM,
+    FAISS_MMAP,
+    CHUNK_META_FILE,
+    LEGACY_METADATA_FILE,
+    COLLECTION_LOCK_FILE
+)
+from core.chunk_store import ChunkStore, migrate_pickle
+from core.sharded_index import (
+    load_index,
+    index_dim,
+    index_marker,
+    index_files
+)
+
+
+# =====================================================
+# COLLECTION PATHS
+# =====================================================
+
+COLLECTION_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def validate_collection_name(name: str) -> str:
+
+    if not COLLECTION_NAME_PATTERN.match(name or ""):
+        raise ValueError(
+            f"Invalid collection name {name!r}: use 1-64 letters, digits, '-' or '_'"
+        )
+
+    return name
+
+
+def collection_dir(name: str = COLLECTION_NAME) -> str:
+
+    validate_collection_name(name)
+
+    # The default collection keeps the original data/ layout
+    if name == COLLECTION_NAME:
+        return DATA_DIR
+
+    return os.path.join(COLLECTIONS_DIR, name)
+
+
+def collection_paths(name: str = COLLECTION_NAME):
+    """
+    Returns (index marker, chunk meta) paths. The marker is faiss.index,
+    or shards/manifest.json for a sharded collection.
+    """
+
+    base = collection_dir(name)
+
+    return (
+        index_marker(base),
+        os.path.join(base, CHUNK_META_FILE)
+    )
+
+
+# =====================================================
+# WRITE LOCK
+# =====================================================
+
+_write_locks = {}
+_write_locks_guard = threading.Lock()
+
+
+@contextmanager
+def collection_lock(name: str = COLLECTION_NAME):
+    """
+    Serializes writers to one collection: a lock per process for threads
+    (app uploads) plus an flock on .write.lock for other processes (bulk
+    CLI, other app workers). Re-entrant within a thread. Readers never
+    take it.
+    """
+
+    base = collection_dir(name)
+
+    with _write_locks_guard:
+        state = _write_locks.setdefault(base, {"lock": threading.RLock(), "depth": 0, "file": None})
+
+    with state["lock"]:
+
+        # flock is per open file, so only the outermost holder takes it
+        if state["depth"] == 0:
+            os.makedirs(base, exist_ok=True)
+            state["file"] = open(os.path.join(base, COLLECTION_LOCK_FILE), "a")
+            fcntl.flock(state["file"], fcntl.LOCK_EX)
+
+        state["depth"] += 1
+
+        try:
+            yield
+
+        finally:
+
+            state["depth"] -= 1
+
+            if state["depth"] == 0:
+                fcntl.flock(state["file"], fcntl.LOCK_UN)
+                state["file"].close()
+                state["file"] = None
+
+
+def open_chunk_store(name: str = COLLECTION_NAME) -> ChunkStore:
+
+    base = collection_dir(name)
+
+    legacy_path = os.path.join(base, LEGACY_METADATA_FILE)
+    _, meta_path = collection_paths(name)
+
+    # One-time conversion of collections indexed before the chunk store.
+    # Under the write lock, so two processes never migrate at once.
+    if not os.path.exists(meta_path) and os.path.exists(legacy_path):
+
+        with collection_lock(name):
+
+            if not os.path.exists(meta_path):
+                return migrate_pickle(legacy_path, base)
+
+    return ChunkStore(base)
+
+
+def collection_version(name: str = COLLECTION_NAME):
+    """
+    Returns the index/chunk-meta mtimes, or None if the collection has no
+    index yet. Ingestion rewrites both, so a changed version means reload.
+    Only stats files: a legacy collection is versioned by its pickle until
+    load_faiss() migrates it.
+    """
+
+    index_path, meta_path = collection_paths(name)
+
+    if not os.path.exists(index_path):
+        return None
+
+    if not os.path.exists(meta_path):
+
+        meta_path = os.path.join(collection_dir(name), LEGACY_METADATA_FILE)
+
+        if not os.path.exists(meta_path):
+            return None
+
+    return (os.path.getmtime(index_path), os.path.getmtime(meta_path))
+
+
+def list_collections():
+
+    names = []
+
+    if collection_version(COLLECTION_NAME) is not None:
+        names.append(COLLECTION_NAME)
+
+    if os.path.isdir(COLLECTIONS_DIR):
+        for name in sorted(os.listdir(COLLECTIONS_DIR)):
+            if COLLECTION_NAME_PATTERN.match(name) and name != COLLECTION_NAME:
+                names.append(name)
+
+    return names
+
+
+# =====================================================
+# PREFAULT
+# =====================================================
+
+PREFAULT_BLOCK_BYTES = 8 * 1024 * 1024
+
+
+def prefault_file(path: str, block_size: int = PREFAULT_BLOCK_BYTES):
+
+    with open(path, "rb") as f:
+
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+
+        while f.read(block_size):
+            pass
+
+
+# =====================================================
+# LOAD FAISS
+# =====================================================
+
+def load_faiss(name: str = COLLECTION_NAME):
+
+    index_path, _ = collection_paths(name)
+
+    if not os.path.exists(index_path):
+        raise FileNotFoundError(f"FAISS index not found for collection '{name}'")
+
+    index = load_index(collection_dir(name))
+
+    store = open_chunk_store(name)
+
+    if len(store) == 0:
+        raise FileNotFoundError(f"Chunk store not found for collection '{name}'")
+
+    return index, store
+
+
+def collection_dim(name: str = COLLECTION_NAME) -> int:
+    """
+    Embedding dimension of a collection: whatever its index was built
+    with (collections are migrated one at a time), or EMBEDDING_DIM for a
+    collection that has no index yet.
+    """
+
+    index_path, _ = collection_paths(name)
+
+    if not os.path.exists(index_path):
+        return EMBEDDING_DIM
+
+    return index_dim(collection_dir(name))
+
+
+def check_dimension(index, dim: int, name: str = COLLECTION_NAME):
+
+    # Only trips if the index was migrated between embedding and use
+    if index.d != dim:
+        raise ValueError(
+            f"Collection '{name}' index has {index.d}-dim vectors but embeddings "
+            f"are {dim}-dim; it was probably migrated meanwhile, retry"
+        )
+
+
+def estimate_nbytes(index, store) -> int:
+
+    # Flat float32 vectors + the resident chunk arrays (text stays mmapped).
+    # Memory-mapped vectors live in the shared page cache, not the process.
+    vectors = 0 if FAISS_MMAP else index.ntotal * index.d * 4
+
+    return vectors + store.resident_nbytes()
+
+
+# =====================================================
+# LRU OF LOADED COLLECTIONS
+# =====================================================
+
+class CollectionCache:
+    """
+    Process-level LRU of loaded (index, chunk store) pairs.
+
+    Collections are evicted least-recently-used first once the estimated
+    resident size exceeds max_bytes. The most recently used collection is
+    never evicted, even if it alone is over budget.
+
+    Loads run outside the cache lock, behind a per-collection load lock, so
+    a cold collection never blocks queries on the ones already loaded and
+    concurrent misses on the same collection load it once.
+    """
+
+    def __init__(self, max_bytes: int):
+
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+        self.load_locks = {}
+
+    def lookup(self, name: str, version):
+
+        with self.lock:
+
+            entry = self.entries.get(name)
+
+            if entry is None or entry["version"] != version:
+                return None
+
+            self.entries.move_to_end(name)
+
+            return entry["index"], entry["store"]
+
+    def get(self, name: str = COLLECTION_NAME):
+
+        version = collection_version(name)
+
+        if version is None:
+            raise FileNotFoundError(f"No index for collection '{name}'")
+
+        cached = self.lookup(name, version)
+
+        if cached is not None:
+            return cached
+
+        with self.lock:
+            load_lock = self.load_locks.setdefault(name, threading.Lock())
+
+        with load_lock:
+
+            # Another caller may have loaded it while we waited
+            cached = self.lookup(name, version)
+
+            if cached is not None:
+                return cached
+
+            print(f"📂 Loading collection '{name}'...")
+
+            index, store = load_faiss(name)
+
+            nbytes = estimate_nbytes(index, store)
+
+            with self.lock:
+
+                self.drop(name)
+
+                self.entries[name] = {
+                    "version": version,
+                    "index": index,
+                    "store": store,
+                    "nbytes": nbytes
+                }
+                self.total_bytes += nbytes
+
+                self.evict()
+
+            return index, store
+
+    def drop(self, name: str):
+
+        entry = self.entries.pop(name, None)
+
+        if entry is not None:
+            self.total_bytes -= entry["nbytes"]
+
+    def evict(self):
+
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+
+            name = next(iter(self.entries))
+
+            print(f"♻️ Evicting collection '{name}' from memory")
+
+            self.drop(name)
+
+
+_collection_cache = CollectionCache(COLLECTION_CACHE_MAX_MB * 1024 * 1024)
+
+
+def get_collection(name: str = COLLECTION_NAME):
+
+    return _collection_cache.get(name)
+
+
+# =====================================================
+# WARM-UP
+# =====================================================
+
+def warm_up_collection(name: str = COLLECTION_NAME):
+    """
+    Loads a collection and, when the index is memory-mapped, touches all of
+    its pages so the first real query does not pay for page faults.
+
+    An in-RAM load already read the whole index, and chunk text is only ever
+    read for the top-k hits, so neither is prefaulted.
+    """
+
+    start = time.perf_counter()
+
+    index, _ = get_collection(name)
+
+    if FAISS_MMAP:
+
+        for path in index_files(collection_dir(name)):
+            prefault_file(path)
+
+        # A flat search scans every vector (in every shard), mapping all pages in
+        index.search(np.zeros((1, index.d), dtype="float32"), 1)
+
+    print(f"🔥 Warmed collection '{name}' in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,279 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import numpy as np
+
+from concurrent.futures import ThreadPoolExecutor
+
+from config import COLLECTION_NAME, EMBEDDING_DIM
+from core.model_client import get_model_client
+from core.collection_manager import (
+    collection_dir,
+    collection_lock,
+    collection_version,
+    load_faiss
+)
+from core.sharded_index import (
+    ShardedIndex,
+    create_index,
+    save_index,
+    add_vectors,
+    index_files,
+    index_marker
+)
+
+
+# =====================================================
+# CONFIG
+# =====================================================
+
+DEFAULT_WORKERS = 8
+DEFAULT_SAMPLE_QUERIES = 50
+DEFAULT_TOP_K = 5
+
+REPORT_FILE = "migration_report.json"
+
+
+# =====================================================
+# RE-EMBED
+# =====================================================
+
+def embed_all(texts, dim: int, workers: int = DEFAULT_WORKERS):
+
+    model = get_model_client()
+
+    vectors = np.zeros((len(texts), dim), dtype="float32")
+
+    def embed_one(i):
+        vectors[i] = model.embed(texts[i], dim)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+
+        for done, _ in enumerate(executor.map(embed_one, range(len(texts))), start=1):
+
+            if done % 100 == 0 or done == len(texts):
+                print(f"   ✔ Re-embedded {done}/{len(texts)} chunks")
+
+    return vectors
+
+
+# =====================================================
+# SAMPLE QUERIES
+# =====================================================
+
+def sample_queries(store, count: int, seed: int = 0):
+
+    # First line of random chunks: close enough to real questions to show
+    # whether neighbourhoods survive the dimension change
+    rng = random.Random(seed)
+
+    picks = rng.sample(range(len(store)), min(count, len(store)))
+
+    queries = []
+
+    for i in picks:
+
+        lines = [line.strip() for line in store.text(i).splitlines() if line.strip()]
+
+        if lines:
+            queries.append(lines[0][:300])
+
+    return queries
+
+
+def load_queries(path: str):
+
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+# =====================================================
+# RECALL REPORT
+# =====================================================
+
+def recall_report(old_index, new_index, queries, new_dim: int, top_k: int):
+    """
+    Treats the current index's top-k as ground truth and measures how much
+    of it the rebuilt index returns for the same queries.
+    """
+
+    model = get_model_client()
+
+    old_dim = old_index.d
+
+    recalls = []
+
+    for query in queries:
+
+        old_vec = np.array([model.embed(query, old_dim)], dtype="float32")
+        new_vec = np.array([model.embed(query, new_dim)], dtype="float32")
+
+        _, old_ids = old_index.search(old_vec, top_k)
+        _, new_ids = new_index.search(new_vec, top_k)
+
+        expected = {int(i) for i in old_ids[0] if i >= 0}
+        found = {int(i) for i in new_ids[0] if i >= 0}
+
+        recalls.append(len(expected & found) / len(expected) if expected else 1.0)
+
+    recalls = np.array(recalls) if recalls else np.array([1.0])
+
+    return {
+        "queries": len(queries),
+        "top_k": top_k,
+        "old_dim": old_dim,
+        "new_dim": new_dim,
+        "mean_recall": round(float(recalls.mean()), 4),
+        "min_recall": round(float(recalls.min()), 4),
+        "p10_recall": round(float(np.percentile(recalls, 10)), 4),
+        "old_index_mb": round(old_index.ntotal * old_dim * 4 / 1024 / 1024, 2),
+        "new_index_mb": round(new_index.ntotal * new_dim * 4 / 1024 / 1024, 2)
+    }
+
+
+# =====================================================
+# MIGRATE
+# =====================================================
+
+def migrate_collection(
+    collection: str = COLLECTION_NAME,
+    dim: int = EMBEDDING_DIM,
+    queries=None,
+    sample: int = DEFAULT_SAMPLE_QUERIES,
+    top_k: int = DEFAULT_TOP_K,
+    workers: int = DEFAULT_WORKERS,
+    dry_run: bool = False
+):
+    """
+    Rebuilds a collection's FAISS index at a new embedding dimension.
+
+    Every chunk is re-embedded at `dim`, a recall report against the
+    current index is written to migration_report.json, and unless dry_run
+    is set the new index replaces the old one (kept in index.<d>.bak/).
+
+    Returns:
+        dict: the recall report
+    """
+
+    print("\n=================================================")
+    print("🚀 EMBEDDING MIGRATION STARTED")
+    print(f"📂 {collection} → {dim} dims")
+    print("=================================================\n")
+
+    # Snapshot after loading: a legacy collection is converted to a chunk
+    # store on first load, which itself changes the version
+    with collection_lock(collection):
+
+        old_index, store = load_faiss(collection)
+
+        version = collection_version(collection)
+
+    if len(store) != old_index.ntotal:
+        raise ValueError(
+            f"Chunk store has {len(store)} chunks but index has {old_index.ntotal} vectors"
+        )
+
+    start = time.perf_counter()
+
+    print(f"🧠 Re-embedding {len(store)} chunks...")
+
+    vectors = embed_all([store.text(i) for i in range(len(store))], dim, workers)
+
+    # Keep the collection's current shard layout
+    if isinstance(old_index, ShardedIndex):
+        new_index = create_index(dim, old_index.num_shards, old_index.shard_by)
+    else:
+        new_index = create_index(dim, 1)
+
+    add_vectors(new_index, vectors, [store.file_name(i) for i in range(len(store))])
+
+    print(f"✅ New index built in {time.perf_counter() - start:.1f}s\n")
+
+    if queries is None:
+        queries = sample_queries(store, sample)
+
+    print(f"📏 Measuring recall@{top_k} on {len(queries)} queries...")
+
+    report = recall_report(old_index, new_index, queries, dim, top_k)
+    report["collection"] = collection
+    report["applied"] = not dry_run
+
+    for key, value in report.items():
+        print(f"   {key}: {value}")
+
+    if not dry_run:
+
+        base = collection_dir(collection)
+
+        backup_dir = os.path.join(base, f"index.{old_index.d}.bak")
+
+        with collection_lock(collection):
+
+            # Chunks ingested while re-embedding have no vector in new_index
+            if collection_version(collection) != version:
+                raise RuntimeError(
+                    f"Collection '{collection}' changed during the migration; re-run it"
+                )
+
+            os.makedirs(backup_dir, exist_ok=True)
+
+            # Shard files plus the manifest when sharded, otherwise faiss.index
+            for path in dict.fromkeys(index_files(base) + [index_marker(base)]):
+                shutil.copy2(path, backup_dir)
+
+            save_index(new_index, base)
+
+        print(f"\n💾 Index replaced (old index files kept in {backup_dir})")
+
+    report_path = os.path.join(collection_dir(collection), REPORT_FILE)
+
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"📝 Report written to {report_path}")
+
+    print("=================================================\n")
+
+    return report
+
+
+# =====================================================
+# CLI
+# =====================================================
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(
+        description="Rebuild a collection's index at a different embedding dimension."
+    )
+    parser.add_argument("--collection", default=COLLECTION_NAME)
+    parser.add_argument("--dim", type=int, default=EMBEDDING_DIM)
+    parser.add_argument("--queries", help="File with one sample query per line")
+    parser.add_argument("--sample", type=int, default=DEFAULT_SAMPLE_QUERIES,
+                        help="Queries to sample from the corpus if --queries is not given")
+    parser.add_argument("--top-k", type=int, default=DEFAULT_TOP_K)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Only report recall; keep the current index")
+
+    args = parser.parse_args(argv)
+
+    migrate_collection(
+        collection=args.collection,
+        dim=args.dim,
+        queries=load_queries(args.queries) if args.queries else None,
+        sample=args.sample,
+        top_k=args.top_k,
+        workers=args.workers,
+        dry_run=args.dry_run
+    )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,434 @@
+import time
+import random
+import asyncio
+import threading
+import httpx
+import numpy as np
+
+from collections import deque
+from google import genai
+from google.genai import types, errors
+
+from config import (
+    GEMINI_API_KEY,
+    GEMINI_BASE_URL,
+    EMBEDDING_MODEL,
+    EMBEDDING_DIM,
+    LLM_MODEL,
+    EMBED_REQUESTS_PER_MIN,
+    LLM_REQUESTS_PER_MIN,
+    MODEL_MAX_CONCURRENCY,
+    MODEL_MAX_RETRIES
+)
+
+# =====================================================
+# TOKEN BUCKET
+# =====================================================
+
+class TokenBucket:
+    """
+    Classic token bucket: refills at `rate` tokens/sec up to `capacity`.
+
+    reserve() never blocks; it returns how long the caller must wait
+    before the token it just took becomes valid.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+
+        with self.lock:
+
+            now = time.monotonic()
+
+            self.tokens = min(
+                self.capacity,
+                self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+
+            self.tokens -= 1
+
+            if self.tokens >= 0:
+                return 0.0
+
+            return -self.tokens / self.rate
+
+    def acquire(self):
+
+        wait = self.reserve()
+
+        if wait > 0:
+            time.sleep(wait)
+
+
+# =====================================================
+# ADAPTIVE (AIMD) CONCURRENCY
+# =====================================================
+
+class AdaptiveConcurrency:
+    """
+    Concurrency limit that grows by ~1 per window of successful calls and
+    halves on throttling, so it settles around the quota actually available.
+
+    Threads (enter) and coroutines (aenter) queue for slots in one FIFO,
+    and leave() hands freed slots to the head of it, so neither side can
+    starve the other.
+    """
+
+    def __init__(self, initial: float = 4, maximum: float = 32, minimum: float = 1):
+
+        self.limit = float(initial)
+        self.maximum = float(maximum)
+        self.minimum = float(minimum)
+        self.in_flight = 0
+        self.waiters = deque()
+        self.lock = threading.Lock()
+
+    def grant(self):
+
+        # Caller holds self.lock
+        while self.waiters and self.in_flight < int(self.limit):
+
+            waiter = self.waiters.popleft()
+            waiter["granted"] = True
+            self.in_flight += 1
+
+            waiter["wake"]()
+
+    def enter(self):
+
+        with self.lock:
+
+            if not self.waiters and self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return
+
+            event = threading.Event()
+            self.waiters.append({"granted": False, "wake": event.set})
+
+        event.wait()
+
+    async def aenter(self):
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def wake():
+            # Called from whichever thread freed the slot
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+        with self.lock:
+
+            if not self.waiters and self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return
+
+            waiter = {"granted": False, "wake": wake}
+            self.waiters.append(waiter)
+
+        try:
+            await future
+
+        except asyncio.CancelledError:
+
+            with self.lock:
+
+                # Granted just as we were cancelled: pass the slot on
+                if waiter["granted"]:
+                    self.in_flight -= 1
+                    self.grant()
+                else:
+                    self.waiters.remove(waiter)
+
+            raise
+
+    def leave(self, throttled: bool = False):
+
+        with self.lock:
+
+            self.in_flight -= 1
+
+            if throttled:
+                self.limit = max(self.minimum, self.limit / 2)
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+            self.grant()
+
+
+# =====================================================
+# RETRY POLICY
+# =====================================================
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+def is_throttle(exc: Exception) -> bool:
+
+    return getattr(exc, "code", None) == 429
+
+
+def is_retryable(exc: Exception) -> bool:
+
+    if isinstance(exc, errors.APIError):
+        return exc.code in RETRYABLE_STATUS
+
+    return isinstance(exc, httpx.TransportError)
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 30.0) -> float:
+
+    # Full jitter: uniform in [0, min(cap, base * 2^attempt)]
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+# =====================================================
+# EMBEDDING OUTPUT
+# =====================================================
+
+def normalize(values):
+
+    # Truncated (< 3072) Gemini embeddings are not unit length; normalizing
+    # keeps L2 distances comparable across dimensions
+    vector = np.asarray(values, dtype="float32")
+
+    norm = np.linalg.norm(vector)
+
+    return vector / norm if norm > 0 else vector
+
+
+def embed_config(dim: int):
+
+    return types.EmbedContentConfig(output_dimensionality=dim)
+
+
+# =====================================================
+# MODEL CLIENT
+# =====================================================
+
+class ModelClient:
+    """
+    Rate-limited, retrying wrapper around the Gemini client.
+
+    Embedding and generation calls have separate token buckets but share
+    one AIMD concurrency limit, since both draw on the same API key.
+    """
+
+    def __init__(
+        self,
+        api_key: str = GEMINI_API_KEY,
+        base_url: str = GEMINI_BASE_URL,
+        embed_rpm: float = EMBED_REQUESTS_PER_MIN,
+        llm_rpm: float = LLM_REQUESTS_PER_MIN,
+        max_concurrency: int = MODEL_MAX_CONCURRENCY,
+        max_retries: int = MODEL_MAX_RETRIES
+    ):
+
+        http_options = types.HttpOptions(base_url=base_url) if base_url else None
+
+        self.client = genai.Client(api_key=api_key, http_options=http_options)
+
+        self.embed_bucket = TokenBucket(embed_rpm / 60)
+        self.llm_bucket = TokenBucket(llm_rpm / 60)
+
+        self.concurrency = AdaptiveConcurrency(
+            initial=min(4, max_concurrency),
+            maximum=max_concurrency
+        )
+
+        self.max_retries = max_retries
+
+    def call(self, bucket: TokenBucket, fn, *args, **kwargs):
+
+        attempt = 0
+
+        while True:
+
+            bucket.acquire()
+            self.concurrency.enter()
+
+            try:
+                result = fn(*args, **kwargs)
+
+            except Exception as exc:
+
+                self.concurrency.leave(throttled=is_throttle(exc))
+
+                if not is_retryable(exc) or attempt >= self.max_retries:
+                    raise
+
+                delay = backoff_delay(attempt)
+                attempt += 1
+
+                print(f"⚠️ Model call failed ({exc.__class__.__name__}), "
+                      f"retry {attempt}/{self.max_retries} in {delay:.1f}s")
+
+                time.sleep(delay)
+                continue
+
+            self.concurrency.leave()
+
+            return result
+
+    async def acall(self, bucket: TokenBucket, fn, *args, **kwargs):
+
+        # Same policy as call(), sharing the bucket and AIMD state with it,
+        # but waiting with asyncio primitives so the event loop stays free
+        attempt = 0
+
+        while True:
+
+            wait = bucket.reserve()
+
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+            await self.concurrency.aenter()
+
+            try:
+                result = await fn(*args, **kwargs)
+
+            except asyncio.CancelledError:
+                self.concurrency.leave()
+                raise
+
+            except Exception as exc:
+
+                self.concurrency.leave(throttled=is_throttle(exc))
+
+                if not is_retryable(exc) or attempt >= self.max_retries:
+                    raise
+
+                delay = backoff_delay(attempt)
+                attempt += 1
+
+                print(f"⚠️ Model call failed ({exc.__class__.__name__}), "
+                      f"retry {attempt}/{self.max_retries} in {delay:.1f}s")
+
+                await asyncio.sleep(delay)
+                continue
+
+            self.concurrency.leave()
+
+            return result
+
+    def embed(self, text: str, dim: int = EMBEDDING_DIM):
+
+        response = self.call(
+            self.embed_bucket,
+            self.client.models.embed_content,
+            model=EMBEDDING_MODEL,
+            contents=text,
+            config=embed_config(dim)
+        )
+
+        return normalize(response.embeddings[0].values)
+
+    def generate(self, prompt: str) -> str:
+
+        response = self.call(
+            self.llm_bucket,
+            self.client.models.generate_content,
+            model=LLM_MODEL,
+            contents=prompt
+        )
+
+        return response.text.strip()
+
+    async def aembed(self, text: str, dim: int = EMBEDDING_DIM):
+
+        response = await self.acall(
+            self.embed_bucket,
+            self.client.aio.models.embed_content,
+            model=EMBEDDING_MODEL,
+            contents=text,
+            config=embed_config(dim)
+        )
+
+        return normalize(response.embeddings[0].values)
+
+    async def agenerate(self, prompt: str) -> str:
+
+        response = await self.acall(
+            self.llm_bucket,
+            self.client.aio.models.generate_content,
+            model=LLM_MODEL,
+            contents=prompt
+        )
+
+        return response.text.strip()
+
+
+# =====================================================
+# SHARED INSTANCE
+# =====================================================
+
+_model_client = None
+_model_client_lock = threading.Lock()
+
+
+def get_model_client() -> ModelClient:
+
+    global _model_client
+
+    with _model_client_lock:
+
+        if _model_client is None:
+
+            print("🔐 Initializing Gemini client...")
+
+            _model_client = ModelClient()
+
+            print("✅ Gemini client ready\n")
+
+        return _model_client
+
+
+# =====================================================
+# SHARED EVENT LOOP
+# =====================================================
+#
+# The async Gemini client keeps connections bound to the loop it first
+# ran on, so sync callers run coroutines on one long-lived loop thread
+# instead of a fresh asyncio.run() per call.
+
+_event_loop = None
+_event_loop_lock = threading.Lock()
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+
+    global _event_loop
+
+    with _event_loop_lock:
+
+        if _event_loop is None:
+
+            _event_loop = asyncio.new_event_loop()
+
+            threading.Thread(
+                target=_event_loop.run_forever,
+                name="model-client-loop",
+                daemon=True
+            ).start()
+
+        return _event_loop
+
+
+def run_coroutine(coro):
+
+    future = asyncio.run_coroutine_threadsafe(coro, get_event_loop())
+
+    try:
+        return future.result()
+    except BaseException:
+        # e.g. KeyboardInterrupt in the caller: stop the coroutine too
+        future.cancel()
+        raise
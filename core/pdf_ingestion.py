@@ -1,66 +1,81 @@
 import fitz
 import os
-import uuid
-import pickle
-import faiss
 import numpy as np
 
-from google import genai
-
-from config import GEMINI_API_KEY, EMBEDDING_MODEL
+from config import COLLECTION_NAME, EMBEDDING_DIM
+from core.model_client import get_model_client
+from core.collection_manager import (
+    collection_dir,
+    collection_paths,
+    open_chunk_store,
+    check_dimension,
+    collection_lock,
+    collection_dim
+)
+from core.sharded_index import load_index, create_index, save_index, add_vectors, truncate_index
+from core.upload_store import spool_upload, lookup_ingested, register_ingested
+from core.single_flight import get_group
 
 
 # =====================================================
-# CONFIG
+# GEMINI CLIENT
 # =====================================================
 
-DATA_DIR = "data"
+model = get_model_client()
 
-FAISS_INDEX_PATH = f"{DATA_DIR}/faiss.index"
-METADATA_PATH = f"{DATA_DIR}/metadata.pkl"
-
-os.makedirs(DATA_DIR, exist_ok=True)
+ingestions = get_group("ingestion")
 
 
 # =====================================================
-# GEMINI CLIENT
+# LOAD / CREATE FAISS
 # =====================================================
 
-print("🔐 Initializing Gemini client...")
+def load_or_create_faiss(dim: int, collection: str = COLLECTION_NAME):
 
-client = genai.Client(api_key=GEMINI_API_KEY)
+    index_path, _ = collection_paths(collection)
 
-print("✅ Gemini client ready\n")
+    # Appends go to the chunk store's pending list until save_faiss()
+    store = open_chunk_store(collection)
 
+    if os.path.exists(index_path):
 
-# =====================================================
-# LOAD / CREATE FAISS
-# =====================================================
+        print(f"📂 Loading existing FAISS index ({collection})...")
+
+        # Writable copy: never memory-mapped
+        index = load_index(collection_dir(collection), mmap=False)
 
-def load_or_create_faiss(dim: int):
+        check_dimension(index, dim, collection)
 
-    if os.path.exists(FAISS_INDEX_PATH):
+        # A crash between the index save and the chunk store flush leaves
+        # vectors with no chunk. Ids are store positions, so dropping the
+        # tail repairs it (readers already skip ids past the store).
+        # Callers hold the collection write lock.
+        if index.ntotal > len(store):
 
-        print("📂 Loading existing FAISS index...")
+            print(f"🩹 Dropping {index.ntotal - len(store)} vectors with no chunk "
+                  "(interrupted save)")
 
-        index = faiss.read_index(FAISS_INDEX_PATH)
+            truncate_index(index, len(store))
 
-        with open(METADATA_PATH, "rb") as f:
-            metadata = pickle.load(f)
+        # Vector ids are chunk store positions; never append past a mismatch
+        if index.ntotal != len(store):
+            raise RuntimeError(
+                f"Collection '{collection}' index has {index.ntotal} vectors but "
+                f"its chunk store has {len(store)} chunks"
+            )
 
         print(f"✅ Loaded {index.ntotal} existing vectors\n")
 
     else:
 
-        print("📦 Creating new FAISS index...")
+        print(f"📦 Creating new FAISS index ({collection})...")
 
-        index = faiss.IndexFlatL2(dim)
-
-        metadata = []
+        # FAISS_NUM_SHARDS > 1 creates a sharded index
+        index = create_index(dim)
 
         print("✅ New index created\n")
 
-    return index, metadata
+    return index, store
 
 
 # =====================================================
@@ -129,81 +144,99 @@ def overlap_pages(pages, overlap_ratio=0.2):
 # 3. EMBEDDING
 # =====================================================
 
-def generate_embedding(text: str):
+def generate_embedding(text: str, dim: int = EMBEDDING_DIM):
 
-    response = client.models.embed_content(
-        model=EMBEDDING_MODEL,
-        contents=text
-    )
-
-    return response.embeddings[0].values
+    return model.embed(text, dim)
 
 
 # =====================================================
-# 4. INGEST (APPEND MODE)
+# 4. EMBED + SAVE HELPERS
 # =====================================================
 
-def ingest_chunks(chunks, file_name):
-
-    print("💾 Ingesting (append mode)...")
-
-    # Embed first chunk to get dimension
-    first_vector = generate_embedding(chunks[0][1])
-
-    dim = len(first_vector)
+def embed_chunks(chunks, dim: int = EMBEDDING_DIM):
 
-    # Load or create FAISS
-    index, metadata = load_or_create_faiss(dim)
+    vectors = []
 
-    vectors = [first_vector]
-    records = []
+    for i, (page_no, chunk_text) in enumerate(chunks, start=1):
 
-    # First chunk
-    page, text = chunks[0]
+        vectors.append(generate_embedding(chunk_text, dim))
 
-    records.append({
-        "id": str(uuid.uuid4()),
-        "file": file_name,
-        "page": page,
-        "chunk_no": len(metadata) + 1,
-        "content": text
-    })
-
-    print("   ✔ Embedded chunk 1")
+        print(f"   ✔ Embedded chunk {i}")
 
-    # Remaining chunks
-    for i, (page_no, chunk_text) in enumerate(chunks[1:], start=2):
+    return vectors
 
-        embedding = generate_embedding(chunk_text)
 
-        vectors.append(embedding)
+def build_records(chunks, file_name, start_no: int):
 
-        record = {
-            "id": str(uuid.uuid4()),
+    return [
+        {
             "file": file_name,
             "page": page_no,
-            "chunk_no": len(metadata) + i,
+            "chunk_no": start_no + i,
             "content": chunk_text
         }
+        for i, (page_no, chunk_text) in enumerate(chunks, start=1)
+    ]
 
-        records.append(record)
 
-        print(f"   ✔ Embedded chunk {i}")
+def save_faiss(index, store, collection: str = COLLECTION_NAME):
+
+    save_index(index, collection_dir(collection))
+
+    # Flushing the chunk store last publishes the new chunks
+    store.flush()
+
+
+# =====================================================
+# 5. INGEST (APPEND MODE)
+# =====================================================
+
+def ingest_chunks(chunks, file_name, collection: str = COLLECTION_NAME, digest: str = None):
+    """
+    Embeds chunks and appends them to the collection. With a digest, the
+    file is also recorded in the ingested registry, unless another writer
+    registered the same bytes first (then nothing is added).
+
+    Returns:
+        int | None: chunks added, or None if the digest was already indexed
+    """
+
+    print("💾 Ingesting (append mode)...")
+
+    # Documents are embedded at the collection's own dimension.
+    # Embedding is the slow part and needs no lock.
+    vectors = embed_chunks(chunks, collection_dim(collection))
+
+    dim = len(vectors[0])
 
     # Convert to numpy
     vectors = np.array(vectors).astype("float32")
 
-    # Append to FAISS
-    index.add(vectors)
+    # Load, append and save under the write lock, so concurrent ingests
+    # into the collection never save over each other
+    with collection_lock(collection):
+
+        if digest is not None and lookup_ingested(digest, collection) is not None:
+            print("♻️ Indexed by another upload meanwhile | skipping")
+            return None
+
+        # Load or create FAISS
+        index, store = load_or_create_faiss(dim, collection)
+
+        records = build_records(chunks, file_name, len(store))
+
+        # Append to FAISS
+        add_vectors(index, vectors, [file_name] * len(vectors))
 
-    # Append metadata
-    metadata.extend(records)
+        # Append chunk records
+        store.extend(records)
 
-    # Save
-    faiss.write_index(index, FAISS_INDEX_PATH)
+        # Save
+        save_faiss(index, store, collection)
 
-    with open(METADATA_PATH, "wb") as f:
-        pickle.dump(metadata, f)
+        # Registered only once both index and chunk store are on disk
+        if digest is not None:
+            register_ingested({digest: {"file": file_name, "chunks": len(records)}}, collection)
 
     print(f"📊 Total vectors now: {index.ntotal}")
     print("✅ Ingestion completed\n")
@@ -212,23 +245,32 @@ def ingest_chunks(chunks, file_name):
 
 
 # =====================================================
-# 5. MAIN PIPELINE
+# 6. MAIN PIPELINE
 # =====================================================
 
-def pdf_pipeline(pdf_path: str):
+def pdf_pipeline(
+    pdf_path: str,
+    collection: str = COLLECTION_NAME,
+    file_name: str = None,
+    digest: str = None
+):
 
     print("\n=================================================")
     print("🚀 PIPELINE STARTED")
-    print(f"📂 {pdf_path}")
+    print(f"📂 {pdf_path} → {collection}")
     print("=================================================\n")
 
-    file_name = os.path.basename(pdf_path)
+    # Uploads are stored by digest, so callers pass the original name
+    file_name = file_name or os.path.basename(pdf_path)
 
     pages = extract_text_from_pdf(pdf_path)
 
     chunks = overlap_pages(pages)
 
-    count = ingest_chunks(chunks, file_name)
+    count = ingest_chunks(chunks, file_name, collection, digest)
+
+    if count is None:
+        return None
 
     print("=================================================")
     print(f"🎉 COMPLETED | {count} new chunks added")
@@ -237,6 +279,50 @@ def pdf_pipeline(pdf_path: str):
     return count
 
 
+# =====================================================
+# 7. UPLOAD PIPELINE (DEDUPED)
+# =====================================================
+
+def upload_pipeline(fileobj, file_name: str, collection: str = COLLECTION_NAME):
+    """
+    Spools an uploaded file to disk and ingests it unless the same bytes
+    are already indexed in the collection.
+
+    Returns:
+        dict: digest, chunks, duplicate (True if ingestion was skipped)
+    """
+
+    digest, file_path, size = spool_upload(fileobj)
+
+    print(f"💾 File saved: {file_path} ({size} bytes)")
+
+    # Simultaneous uploads of the same bytes wait on one ingestion
+    return ingestions.do(
+        (collection, digest),
+        ingest_upload, digest, file_path, file_name, collection
+    )
+
+
+def ingest_upload(digest: str, file_path: str, file_name: str, collection: str):
+
+    existing = lookup_ingested(digest, collection)
+
+    if existing is not None:
+
+        print(f"♻️ Already indexed as {existing['file']} | skipping")
+
+        return {"digest": digest, "chunks": existing["chunks"], "duplicate": True}
+
+    count = pdf_pipeline(file_path, collection, file_name, digest)
+
+    # Another process ingested the same bytes while this one was embedding
+    if count is None:
+        existing = lookup_ingested(digest, collection)
+        return {"digest": digest, "chunks": existing["chunks"], "duplicate": True}
+
+    return {"digest": digest, "chunks": count, "duplicate": False}
+
+
 # # =====================================================
 # # TEST
 # # =====================================================
@@ -1,72 +1,137 @@
 import os, json
-import pickle
-import faiss
+import asyncio
+import hashlib
 import numpy as np
 from typing import List, Dict
 
-from google import genai
-from config import GEMINI_API_KEY, EMBEDDING_MODEL, LLM_MODEL
+from config import COLLECTION_NAME, EMBEDDING_DIM, RAG_TIMEOUT_SECONDS
+from core.model_client import get_model_client, run_coroutine
+from core.collection_manager import (
+    get_collection,
+    check_dimension,
+    collection_version,
+    collection_dim
+)
+from core.single_flight import get_group
 
 
 # =====================================================
-# CONFIG
+# GEMINI CLIENT
 # =====================================================
 
-DATA_DIR = "data"
-FAISS_INDEX_PATH = f"{DATA_DIR}/faiss.index"
-METADATA_PATH = f"{DATA_DIR}/metadata.pkl"
+model = get_model_client()
 
 
 # =====================================================
-# GEMINI CLIENT
+# REQUEST COALESCING
 # =====================================================
 
-client = genai.Client(api_key=GEMINI_API_KEY)
+# Identical questions arriving together share one embedding + search and
+# one LLM call instead of each paying for their own
+retrievals = get_group("retrieval")
+answers = get_group("answer")
+
+
+def normalize_query(query: str) -> str:
+
+    return " ".join(query.split()).casefold()
+
+
+def retrieval_key(user_query: str, top_k: int, collection: str):
+
+    # The index version keeps a query racing an ingest from sharing
+    # results computed against the older index
+    return (collection, collection_version(collection), top_k, normalize_query(user_query))
+
+
+def answer_key(prompt: str) -> str:
+
+    # The prompt carries the retrieved context and the previous turn, so
+    # only callers that would send the exact same request share an answer
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
 
 
 # =====================================================
 # QUERY EMBEDDING
 # =====================================================
 
-def generate_query_embedding(query: str):
+def generate_query_embedding(query: str, dim: int = EMBEDDING_DIM):
 
-    response = client.models.embed_content(
-        model=EMBEDDING_MODEL,
-        contents=query
-    )
+    return model.embed(query, dim)
+
+
+async def agenerate_query_embedding(query: str, dim: int = EMBEDDING_DIM):
 
-    return response.embeddings[0].values
+    return await model.aembed(query, dim)
 
 
 # =====================================================
-# LOAD FAISS
+# RETRIEVE TOP-K CONTEXT
 # =====================================================
 
-def load_faiss():
+def retrieve_top_k(
+    user_query: str,
+    top_k: int = 3,
+    collection: str = COLLECTION_NAME
+) -> List[Dict]:
 
-    if not os.path.exists(FAISS_INDEX_PATH):
-        raise FileNotFoundError("FAISS index not found")
+    return retrievals.do(
+        retrieval_key(user_query, top_k, collection),
+        _retrieve_top_k, user_query, top_k, collection
+    )
 
-    if not os.path.exists(METADATA_PATH):
-        raise FileNotFoundError("Metadata not found")
 
-    index = faiss.read_index(FAISS_INDEX_PATH)
+def _retrieve_top_k(user_query: str, top_k: int, collection: str):
 
-    with open(METADATA_PATH, "rb") as f:
-        metadata = pickle.load(f)
+    # Served from the process-level LRU; only cold collections hit disk
+    index, store = get_collection(collection)
 
-    return index, metadata
+    # Queries are embedded at the collection's own dimension
+    query_vec = generate_query_embedding(user_query, index.d)
 
+    return search_top_k(index, store, query_vec, top_k, collection)
 
-# =====================================================
-# RETRIEVE TOP-K CONTEXT
-# =====================================================
 
-def retrieve_top_k(user_query: str, top_k: int = 3) -> List[Dict]:
+async def aretrieve_top_k(
+    user_query: str,
+    top_k: int = 3,
+    collection: str = COLLECTION_NAME
+) -> List[Dict]:
 
-    index, metadata = load_faiss()
+    return await retrievals.ado(
+        retrieval_key(user_query, top_k, collection),
+        _aretrieve_top_k, user_query, top_k, collection
+    )
+
+
+async def _aretrieve_top_k(user_query: str, top_k: int, collection: str):
+
+    # Reads only the index header, so the embedding need not wait for
+    # a cold collection to load
+    dim = await asyncio.to_thread(collection_dim, collection)
+
+    # Index load and query embedding are independent
+    (index, store), query_vec = await asyncio.gather(
+        asyncio.to_thread(get_collection, collection),
+        agenerate_query_embedding(user_query, dim)
+    )
+
+    # FAISS releases the GIL, so the search runs off the event loop
+    return await asyncio.to_thread(
+        search_top_k, index, store, query_vec, top_k, collection
+    )
+
+
+def search_top_k(
+    index,
+    store,
+    query_vec,
+    top_k: int = 3,
+    collection: str = COLLECTION_NAME
+) -> List[Dict]:
+
+    check_dimension(index, len(query_vec), collection)
 
-    query_vec = generate_query_embedding(user_query)
     query_vec = np.array([query_vec]).astype("float32")
 
     distances, indices = index.search(query_vec, top_k)
@@ -74,12 +139,26 @@ def retrieve_top_k(user_query: str, top_k: int = 3) -> List[Dict]:
     retrieved = []
 
     for idx in indices[0]:
-        record = metadata[idx]
+
+        # FAISS pads with -1 when top_k exceeds the number of vectors;
+        # ids past the store are from shards saved by an in-flight ingest
+        if idx < 0 or idx >= len(store):
+            continue
+
+        # Only the hits' text is read from the memory-mapped store
+        record = dict(store[int(idx)], chunk_id=int(idx))
         retrieved.append(record)
 
     return retrieved
 
 
+def get_chunk_content(chunk_id: int, collection: str = COLLECTION_NAME) -> str:
+
+    _, store = get_collection(collection)
+
+    return store.text(chunk_id)
+
+
 # =====================================================
 # BUILD PROMPT FOR GEMINI
 # =====================================================
@@ -148,12 +227,12 @@ ________________________________
 
 def generate_answer(prompt: str) -> str:
 
-    response = client.models.generate_content(
-        model=LLM_MODEL,
-        contents=prompt
-    )
+    return answers.do(answer_key(prompt), model.generate, prompt)
+
+
+async def agenerate_answer(prompt: str) -> str:
 
-    return response.text.strip()
+    return await answers.ado(answer_key(prompt), model.agenerate, prompt)
 
 
 # =====================================================
@@ -201,20 +280,34 @@ def get_last_session_record(session_id: str, session_dir="session"):
 # MAIN RAG PIPELINE
 # =====================================================
 
-def rag_pipeline(user_query: str, session_id, top_k: int = 3):
+def build_result(answer: str, retrieved_chunks: List[Dict], collection: str):
+
+    return {
+        "answer": answer,
+        "citations": [
+            {
+                "collection": collection,
+                "chunk_id": ctx["chunk_id"],
+                "file": ctx["file"],
+                "page": ctx["page"],
+                "chunk_no": ctx["chunk_no"],
+                "content": ctx["content"]
+            }
+            for ctx in retrieved_chunks
+        ]
+    }
 
-    print("\n🚀 RAG PIPELINE STARTED")
-    print("🔍 Retrieving context...")
 
-    # Last_session
-    last_record = get_last_session_record(session_id)
+async def _arag_pipeline(user_query: str, session_id, top_k: int, collection: str):
 
-    # if last_record:
-    #     print("Last Query:", last_record["query"])
-    #     print("Last Answer:", last_record["answer"])
+    print("\n🚀 RAG PIPELINE STARTED")
+    print("🔍 Retrieving context...")
 
-    # Retrieve
-    retrieved_chunks = retrieve_top_k(user_query, top_k)
+    # Session I/O and retrieval are independent
+    last_record, retrieved_chunks = await asyncio.gather(
+        asyncio.to_thread(get_last_session_record, session_id),
+        aretrieve_top_k(user_query, top_k, collection)
+    )
 
     if not retrieved_chunks:
         return {
@@ -222,32 +315,49 @@ def rag_pipeline(user_query: str, session_id, top_k: int = 3):
             "citations": []
         }
 
-
     # Build prompt
     prompt = build_rag_prompt(user_query, retrieved_chunks, last_record)
 
     print("🧠 Generating answer from Gemini...")
 
     # Generate answer
-    answer = generate_answer(prompt)
-
-    # Final Output
-    result = {
-        "answer": answer,
-        "citations": [
-            {
-                "file": ctx["file"],
-                "page": ctx["page"],
-                "chunk_no": ctx["chunk_no"],
-                "content": ctx["content"]
-            }
-            for ctx in retrieved_chunks
-        ]
-    }
+    answer = await agenerate_answer(prompt)
 
     print("✅ RAG PIPELINE COMPLETED\n")
 
-    return result
+    return build_result(answer, retrieved_chunks, collection)
+
+
+async def arag_pipeline(
+    user_query: str,
+    session_id,
+    top_k: int = 3,
+    collection: str = COLLECTION_NAME,
+    timeout: float = RAG_TIMEOUT_SECONDS
+):
+    """
+    Async RAG pipeline. Cancelling the caller cancels every stage still
+    running; exceeding timeout seconds raises asyncio.TimeoutError.
+    """
+
+    return await asyncio.wait_for(
+        _arag_pipeline(user_query, session_id, top_k, collection),
+        timeout
+    )
+
+
+def rag_pipeline(
+    user_query: str,
+    session_id,
+    top_k: int = 3,
+    collection: str = COLLECTION_NAME,
+    timeout: float = RAG_TIMEOUT_SECONDS
+):
+
+    # Sync entry point for app.py; runs on the shared model-client loop
+    return run_coroutine(
+        arag_pipeline(user_query, session_id, top_k, collection, timeout)
+    )
 
 
 # # =====================================================
@@ -0,0 +1,153 @@
+import sys
+import time
+import argparse
+import numpy as np
+
+from config import COLLECTION_NAME, FAISS_SHARD_BY
+from core.collection_manager import collection_dir, collection_lock, open_chunk_store
+from core.migrate_embeddings import embed_all, DEFAULT_WORKERS
+from core.sharded_index import (
+    ShardedIndex,
+    SHARD_STRATEGIES,
+    shard_of,
+    load_index,
+    create_index,
+    save_index,
+    add_vectors,
+    is_sharded,
+    read_manifest,
+    write_shard
+)
+
+
+# =====================================================
+# RESHARD
+# =====================================================
+
+def all_vectors(index):
+
+    # Vectors in chunk-id order, whatever the current layout
+    if not isinstance(index, ShardedIndex):
+        return index.reconstruct_n(0, index.ntotal)
+
+    vectors = np.zeros((index.ntotal, index.d), dtype="float32")
+
+    for shard_no in range(index.num_shards):
+        shard_vectors, ids = index.shard_contents(shard_no)
+        vectors[ids] = shard_vectors
+
+    return vectors
+
+
+def reshard_collection(
+    collection: str = COLLECTION_NAME,
+    num_shards: int = 1,
+    shard_by: str = FAISS_SHARD_BY
+):
+    """
+    Rewrites a collection's index with num_shards shards (1 = a single
+    faiss.index). Vectors are copied, nothing is re-embedded.
+    """
+
+    base = collection_dir(collection)
+
+    start = time.perf_counter()
+
+    # Vectors are only copied, so holding off ingests for the whole run is cheap
+    with collection_lock(collection):
+
+        index = load_index(base, mmap=False)
+        store = open_chunk_store(collection)
+
+        print(f"🔀 Resharding '{collection}': {index.ntotal} vectors → {num_shards} shards ({shard_by})")
+
+        new_index = create_index(index.d, num_shards, shard_by)
+
+        add_vectors(new_index, all_vectors(index), [store.file_name(i) for i in range(index.ntotal)])
+
+        save_index(new_index, base)
+
+    print(f"✅ Resharded in {time.perf_counter() - start:.1f}s")
+
+    return new_index
+
+
+# =====================================================
+# REBUILD ONE SHARD
+# =====================================================
+
+def rebuild_shard(
+    collection: str = COLLECTION_NAME,
+    shard_no: int = 0,
+    workers: int = DEFAULT_WORKERS
+):
+    """
+    Re-embeds the chunks that route to one shard from the chunk store and
+    rewrites only that shard file (plus the manifest). The other shards
+    are not read, so this also recovers a missing or corrupt shard.
+    """
+
+    base = collection_dir(collection)
+
+    if not is_sharded(base):
+        raise ValueError(f"Collection '{collection}' is not sharded")
+
+    # A repair: chunks ingested mid-rebuild would be missing from the shard
+    with collection_lock(collection):
+        _rebuild_shard(base, collection, shard_no, workers)
+
+
+def _rebuild_shard(base: str, collection: str, shard_no: int, workers: int):
+
+    manifest = read_manifest(base)
+
+    num_shards = manifest["num_shards"]
+
+    if not 0 <= shard_no < num_shards:
+        raise ValueError(f"Shard {shard_no} out of range (0-{num_shards - 1})")
+
+    store = open_chunk_store(collection)
+
+    ids = [
+        i for i in range(len(store))
+        if shard_of(i, store.file_name(i), num_shards, manifest["shard_by"]) == shard_no
+    ]
+
+    print(f"🧱 Rebuilding shard {shard_no} of '{collection}' ({len(ids)} chunks)...")
+
+    vectors = embed_all([store.text(i) for i in ids], manifest["dim"], workers)
+
+    write_shard(base, shard_no, vectors, ids)
+
+    print(f"✅ Shard {shard_no} rebuilt")
+
+
+# =====================================================
+# CLI
+# =====================================================
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Reshard a collection or rebuild one shard.")
+    parser.add_argument("--collection", default=COLLECTION_NAME)
+
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--shards", type=int, help="Rewrite the index with this many shards")
+    group.add_argument("--rebuild", type=int, metavar="SHARD",
+                       help="Re-embed and rewrite only this shard")
+
+    parser.add_argument("--by", choices=SHARD_STRATEGIES, default=FAISS_SHARD_BY)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+
+    args = parser.parse_args(argv)
+
+    if args.shards is not None:
+        reshard_collection(args.collection, args.shards, args.by)
+    else:
+        rebuild_shard(args.collection, args.rebuild, args.workers)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,365 @@
+import os
+import json
+import zlib
+import struct
+import shutil
+import faiss
+import numpy as np
+
+from concurrent.futures import ThreadPoolExecutor
+
+from config import (
+    FAISS_INDEX_FILE,
+    FAISS_MMAP,
+    FAISS_NUM_SHARDS,
+    FAISS_SHARD_BY,
+    FAISS_SEARCH_THREADS
+)
+
+
+# =====================================================
+# INDEX FILE I/O
+# =====================================================
+
+SHARD_DIR = "shards"
+MANIFEST_FILE = "manifest.json"
+
+SHARD_STRATEGIES = ("hash", "document")
+
+
+def read_index(index_path: str, mmap: bool = FAISS_MMAP):
+
+    if not mmap:
+        return faiss.read_index(index_path)
+
+    # Zero-copy mapping of the flat vector storage; the index is read-only
+    flags = faiss.IO_FLAG_READ_ONLY | getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+
+    return faiss.read_index(index_path, flags)
+
+
+def write_index(index, index_path: str):
+
+    # Replace rather than overwrite: processes that mmapped the old file
+    # keep reading the old inode instead of a half-written one
+    tmp_path = f"{index_path}.tmp"
+
+    faiss.write_index(index, tmp_path)
+
+    os.replace(tmp_path, index_path)
+
+
+# =====================================================
+# SHARD ROUTING
+# =====================================================
+
+def shard_of(chunk_id: int, file_name: str, num_shards: int, shard_by: str = FAISS_SHARD_BY) -> int:
+
+    if shard_by == "document":
+        # Every chunk of a document lands in the same shard
+        return zlib.crc32(file_name.encode("utf-8")) % num_shards
+
+    return chunk_id % num_shards
+
+
+# =====================================================
+# SHARDED INDEX
+# =====================================================
+
+_search_pool = ThreadPoolExecutor(
+    max_workers=FAISS_SEARCH_THREADS or os.cpu_count() or 1,
+    thread_name_prefix="faiss-shard"
+)
+
+
+class ShardedIndex:
+    """
+    N flat shards searched in parallel with a top-k merge.
+
+    Quacks like a faiss index where the rest of the code needs it (d,
+    ntotal, add, search). Each shard is an IndexIDMap2 holding global
+    chunk ids, so results map straight onto the chunk store. FAISS
+    releases the GIL while searching, so shards run on separate cores.
+    """
+
+    def __init__(self, shards, shard_by: str = FAISS_SHARD_BY, pool: ThreadPoolExecutor = None):
+
+        if shard_by not in SHARD_STRATEGIES:
+            raise ValueError(f"Unknown shard strategy {shard_by!r}")
+
+        self.shards = shards
+        self.shard_by = shard_by
+        self.pool = pool or _search_pool
+        self.dirty = set()
+
+    @classmethod
+    def create(cls, dim: int, num_shards: int, shard_by: str = FAISS_SHARD_BY, pool=None):
+
+        shards = [faiss.IndexIDMap2(faiss.IndexFlatL2(dim)) for _ in range(num_shards)]
+
+        index = cls(shards, shard_by, pool)
+        index.dirty = set(range(num_shards))
+
+        return index
+
+    @property
+    def d(self) -> int:
+
+        return self.shards[0].d
+
+    @property
+    def ntotal(self) -> int:
+
+        return sum(shard.ntotal for shard in self.shards)
+
+    @property
+    def num_shards(self) -> int:
+
+        return len(self.shards)
+
+    # -------------------------------------------------
+    # WRITE
+    # -------------------------------------------------
+
+    def add(self, vectors, file_names=None):
+
+        vectors = np.ascontiguousarray(vectors, dtype="float32")
+
+        ids = np.arange(self.ntotal, self.ntotal + len(vectors), dtype=np.int64)
+
+        targets = np.array([
+            shard_of(int(chunk_id), file_names[i] if file_names else "", self.num_shards, self.shard_by)
+            for i, chunk_id in enumerate(ids)
+        ])
+
+        for shard_no in np.unique(targets):
+
+            mask = targets == shard_no
+
+            self.shards[shard_no].add_with_ids(vectors[mask], ids[mask])
+            self.dirty.add(int(shard_no))
+
+    def truncate(self, n: int):
+
+        # Ids are global, so the same range selects the tail in every shard
+        selector = faiss.IDSelectorRange(n, max(n, self.ntotal))
+
+        for shard_no, shard in enumerate(self.shards):
+            if shard.remove_ids(selector):
+                self.dirty.add(shard_no)
+
+    def shard_contents(self, shard_no: int):
+
+        shard = self.shards[shard_no]
+
+        inner = faiss.downcast_index(shard.index)
+
+        vectors = inner.reconstruct_n(0, inner.ntotal) if inner.ntotal else np.zeros((0, self.d), "float32")
+        ids = faiss.vector_to_array(shard.id_map).astype(np.int64)
+
+        return vectors, ids
+
+    # -------------------------------------------------
+    # SEARCH
+    # -------------------------------------------------
+
+    def search(self, queries, k: int):
+
+        if self.num_shards == 1:
+            return self.shards[0].search(queries, k)
+
+        results = list(self.pool.map(lambda shard: shard.search(queries, k), self.shards))
+
+        distances = np.concatenate([r[0] for r in results], axis=1)
+        indices = np.concatenate([r[1] for r in results], axis=1)
+
+        # Empty slots come back as (huge distance, -1) and sort last
+        order = np.argsort(distances, axis=1, kind="stable")[:, :k]
+
+        return (
+            np.take_along_axis(distances, order, axis=1),
+            np.take_along_axis(indices, order, axis=1)
+        )
+
+    # -------------------------------------------------
+    # SAVE / LOAD
+    # -------------------------------------------------
+
+    def save(self, directory: str):
+        """
+        Writes only shards changed since the last save, then the manifest.
+        The manifest goes last, so readers see either the old or new set.
+        """
+
+        shard_dir = os.path.join(directory, SHARD_DIR)
+
+        os.makedirs(shard_dir, exist_ok=True)
+
+        for shard_no in sorted(self.dirty):
+            write_index(self.shards[shard_no], shard_path(directory, shard_no))
+
+        write_manifest(directory, {
+            "num_shards": self.num_shards,
+            "shard_by": self.shard_by,
+            "dim": self.d,
+            "counts": [shard.ntotal for shard in self.shards]
+        })
+
+        self.dirty.clear()
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = FAISS_MMAP):
+
+        manifest = read_manifest(directory)
+
+        shards = [
+            read_index(shard_path(directory, shard_no), mmap)
+            for shard_no in range(manifest["num_shards"])
+        ]
+
+        return cls(shards, manifest["shard_by"])
+
+
+def shard_path(directory: str, shard_no: int) -> str:
+
+    return os.path.join(directory, SHARD_DIR, f"shard_{shard_no:03d}.index")
+
+
+def read_manifest(directory: str):
+
+    with open(os.path.join(directory, SHARD_DIR, MANIFEST_FILE), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_manifest(directory: str, manifest):
+
+    path = os.path.join(directory, SHARD_DIR, MANIFEST_FILE)
+
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    os.replace(f"{path}.tmp", path)
+
+
+def write_shard(directory: str, shard_no: int, vectors, ids):
+    """
+    Replaces one shard on disk without loading the others, then updates
+    its count in the manifest.
+    """
+
+    manifest = read_manifest(directory)
+
+    shard = faiss.IndexIDMap2(faiss.IndexFlatL2(manifest["dim"]))
+
+    if len(ids):
+        shard.add_with_ids(
+            np.ascontiguousarray(vectors, dtype="float32"),
+            np.asarray(ids, dtype=np.int64)
+        )
+
+    write_index(shard, shard_path(directory, shard_no))
+
+    manifest["counts"][shard_no] = shard.ntotal
+
+    write_manifest(directory, manifest)
+
+
+# =====================================================
+# DIRECTORY LAYOUT
+# =====================================================
+#
+# A collection directory holds either a single faiss.index or
+# shards/manifest.json + shards/shard_NNN.index. The manifest wins if
+# both exist (e.g. mid-reshard).
+
+def is_sharded(directory: str) -> bool:
+
+    return os.path.exists(os.path.join(directory, SHARD_DIR, MANIFEST_FILE))
+
+
+def index_marker(directory: str) -> str:
+
+    # The file written last on save; its mtime versions the whole index
+    if is_sharded(directory):
+        return os.path.join(directory, SHARD_DIR, MANIFEST_FILE)
+
+    return os.path.join(directory, FAISS_INDEX_FILE)
+
+
+def index_files(directory: str):
+
+    if not is_sharded(directory):
+        return [os.path.join(directory, FAISS_INDEX_FILE)]
+
+    manifest = read_manifest(directory)
+
+    return [shard_path(directory, shard_no) for shard_no in range(manifest["num_shards"])]
+
+
+def create_index(dim: int, num_shards: int = FAISS_NUM_SHARDS, shard_by: str = FAISS_SHARD_BY):
+
+    if num_shards <= 1:
+        return faiss.IndexFlatL2(dim)
+
+    return ShardedIndex.create(dim, num_shards, shard_by)
+
+
+def index_dim(directory: str) -> int:
+
+    if is_sharded(directory):
+        return read_manifest(directory)["dim"]
+
+    # Every serialized faiss index starts with a fourcc followed by an
+    # int32 dimension, so the vectors need not be read
+    with open(os.path.join(directory, FAISS_INDEX_FILE), "rb") as f:
+        header = f.read(8)
+
+    return struct.unpack("<i", header[4:8])[0]
+
+
+def load_index(directory: str, mmap: bool = FAISS_MMAP):
+
+    if is_sharded(directory):
+        return ShardedIndex.load(directory, mmap)
+
+    return read_index(os.path.join(directory, FAISS_INDEX_FILE), mmap)
+
+
+def save_index(index, directory: str):
+
+    os.makedirs(directory, exist_ok=True)
+
+    single_path = os.path.join(directory, FAISS_INDEX_FILE)
+
+    if isinstance(index, ShardedIndex):
+
+        index.save(directory)
+
+        if os.path.exists(single_path):
+            os.remove(single_path)
+
+    else:
+
+        write_index(index, single_path)
+
+        if os.path.isdir(os.path.join(directory, SHARD_DIR)):
+            shutil.rmtree(os.path.join(directory, SHARD_DIR))
+
+
+def truncate_index(index, n: int):
+
+    # Drops every vector with id >= n; ids are chunk store positions
+    if isinstance(index, ShardedIndex):
+        index.truncate(n)
+    else:
+        index.remove_ids(faiss.IDSelectorRange(n, index.ntotal))
+
+
+def add_vectors(index, vectors, file_names):
+
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+
+    if isinstance(index, ShardedIndex):
+        index.add(vectors, file_names)
+    else:
+        index.add(vectors)
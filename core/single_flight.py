@@ -0,0 +1,165 @@
+import asyncio
+import threading
+
+
+# =====================================================
+# SINGLE-FLIGHT
+# =====================================================
+#
+# Concurrent calls with the same key share one execution: the first caller
+# runs the function, the rest wait for it and get the same result (or the
+# same exception). The entry is dropped as soon as the call finishes, so
+# this never serves a stale result -- it is not a cache.
+
+
+class _Call:
+
+    def __init__(self):
+
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    One group of coalesced calls (e.g. "answer"), with counters:
+    calls (all callers), executions (calls that ran), coalesced (callers
+    that waited on someone else's execution).
+
+    do() is for threads; ado() is for coroutines on the shared model-client
+    event loop.
+    """
+
+    def __init__(self, name: str):
+
+        self.name = name
+        self.lock = threading.Lock()
+
+        self.calls = {}
+        self.tasks = {}
+
+        self.stats = {"calls": 0, "executions": 0, "coalesced": 0}
+
+    # -------------------------------------------------
+    # THREADS
+    # -------------------------------------------------
+
+    def do(self, key, fn, *args):
+
+        with self.lock:
+
+            self.stats["calls"] += 1
+
+            call = self.calls.get(key)
+            leader = call is None
+
+            if leader:
+                call = self.calls[key] = _Call()
+                self.stats["executions"] += 1
+            else:
+                self.stats["coalesced"] += 1
+
+        if not leader:
+
+            call.done.wait()
+
+            if call.error is not None:
+                raise call.error
+
+            return call.result
+
+        try:
+            call.result = fn(*args)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+
+        return call.result
+
+    # -------------------------------------------------
+    # EVENT LOOP
+    # -------------------------------------------------
+
+    async def ado(self, key, fn, *args):
+
+        with self.lock:
+
+            self.stats["calls"] += 1
+
+            entry = self.tasks.get(key)
+
+            if entry is None:
+
+                entry = self.tasks[key] = {"task": asyncio.ensure_future(fn(*args)), "waiters": 0}
+                entry["task"].add_done_callback(lambda _: self._finish(key, entry))
+
+                self.stats["executions"] += 1
+
+            else:
+                self.stats["coalesced"] += 1
+
+            entry["waiters"] += 1
+
+        try:
+            # Shielded: one caller timing out must not cancel the others
+            return await asyncio.shield(entry["task"])
+
+        except asyncio.CancelledError:
+
+            entry["waiters"] -= 1
+
+            # Last waiter gone: stop the work, and let new callers start fresh
+            if entry["waiters"] == 0:
+                self._finish(key, entry)
+                entry["task"].cancel()
+
+            raise
+
+    def _finish(self, key, entry):
+
+        with self.lock:
+            if self.tasks.get(key) is entry:
+                del self.tasks[key]
+
+        task = entry["task"]
+
+        # Mark the exception as retrieved if every waiter left before it
+        if task.done() and not task.cancelled():
+            task.exception()
+
+
+# =====================================================
+# REGISTRY
+# =====================================================
+
+_groups = {}
+_groups_lock = threading.Lock()
+
+
+def get_group(name: str) -> SingleFlight:
+
+    with _groups_lock:
+
+        if name not in _groups:
+            _groups[name] = SingleFlight(name)
+
+        return _groups[name]
+
+
+def coalescing_stats():
+
+    with _groups_lock:
+        groups = list(_groups.values())
+
+    stats = {}
+
+    for group in groups:
+        with group.lock:
+            stats[group.name] = dict(group.stats)
+
+    return stats
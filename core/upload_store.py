@@ -0,0 +1,145 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+
+from config import (
+    UPLOAD_DIR,
+    COLLECTION_NAME,
+    MAX_UPLOAD_MB,
+    UPLOAD_CHUNK_BYTES,
+    INGESTED_REGISTRY_FILE
+)
+from core.collection_manager import collection_dir
+
+
+# =====================================================
+# STREAMING SPOOL
+# =====================================================
+
+def spool_upload(
+    fileobj,
+    upload_dir: str = UPLOAD_DIR,
+    max_bytes: int = MAX_UPLOAD_MB * 1024 * 1024,
+    chunk_size: int = UPLOAD_CHUNK_BYTES
+):
+    """
+    Streams fileobj to disk in chunk_size pieces while hashing it, then
+    stores it content-addressed as <sha256>.pdf.
+
+    Returns:
+        tuple: (digest, file_path, size)
+
+    Raises:
+        ValueError: if the file is larger than max_bytes
+    """
+
+    os.makedirs(upload_dir, exist_ok=True)
+
+    sha = hashlib.sha256()
+    size = 0
+
+    fd, tmp_path = tempfile.mkstemp(dir=upload_dir, prefix=".upload-", suffix=".part")
+
+    try:
+
+        with os.fdopen(fd, "wb") as f:
+
+            while True:
+
+                block = fileobj.read(chunk_size)
+
+                if not block:
+                    break
+
+                size += len(block)
+
+                if size > max_bytes:
+                    raise ValueError(f"File exceeds {max_bytes // (1024 * 1024)}MB limit.")
+
+                sha.update(block)
+                f.write(block)
+
+        digest = sha.hexdigest()
+
+        file_path = os.path.join(upload_dir, f"{digest}.pdf")
+
+        # Same bytes already on disk: keep the existing copy
+        if os.path.exists(file_path):
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, file_path)
+
+    except BaseException:
+
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+        raise
+
+    return digest, file_path, size
+
+
+def file_digest(file_path: str, chunk_size: int = UPLOAD_CHUNK_BYTES) -> str:
+
+    sha = hashlib.sha256()
+
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            sha.update(block)
+
+    return sha.hexdigest()
+
+
+# =====================================================
+# INGESTED REGISTRY
+# =====================================================
+#
+# Per-collection JSON map of sha256 -> {"file", "chunks"} for every
+# document already in that collection's index.
+
+_registry_lock = threading.Lock()
+
+
+def registry_path(collection: str = COLLECTION_NAME) -> str:
+
+    return os.path.join(collection_dir(collection), INGESTED_REGISTRY_FILE)
+
+
+def load_registry(collection: str = COLLECTION_NAME):
+
+    path = registry_path(collection)
+
+    if not os.path.exists(path):
+        return {}
+
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def lookup_ingested(digest: str, collection: str = COLLECTION_NAME):
+
+    return load_registry(collection).get(digest)
+
+
+def register_ingested(entries, collection: str = COLLECTION_NAME):
+    """
+    entries: dict of digest -> {"file": name, "chunks": count}
+    """
+
+    path = registry_path(collection)
+
+    with _registry_lock:
+
+        registry = load_registry(collection)
+        registry.update(entries)
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        tmp_path = f"{path}.tmp"
+
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(registry, f, indent=2, ensure_ascii=False)
+
+        os.replace(tmp_path, path)
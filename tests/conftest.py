@@ -0,0 +1,101 @@
+import os
+import sys
+import time
+import socket
+import subprocess
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, ROOT)
+
+
+def free_port() -> int:
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# config.py reads the environment at import, so point the shared model
+# client at the session's fake server before any test imports core.*
+FAKE_PORT = free_port()
+TEST_DIM = 64
+
+os.environ["GEMINI_BASE_URL"] = f"http://127.0.0.1:{FAKE_PORT}"
+os.environ["GEMINI_API_KEY"] = "test"
+os.environ["EMBEDDING_DIM"] = str(TEST_DIM)
+
+
+class FakeServer:
+
+    def __init__(self, port: int, *args):
+
+        self.port = port
+        self.url = f"http://127.0.0.1:{port}"
+
+        self.proc = subprocess.Popen(
+            [
+                sys.executable, os.path.join(ROOT, "tools", "fake_gemini_server.py"),
+                "--port", str(port), "--dim", str(TEST_DIM), *args
+            ],
+            stdout=subprocess.PIPE,
+            text=True
+        )
+
+        deadline = time.monotonic() + 10
+
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    self.proc.kill()
+                    raise RuntimeError("fake Gemini server did not start")
+                time.sleep(0.05)
+
+    def stop(self):
+
+        # SIGINT makes the server print its stats line on the way out
+        self.proc.send_signal(2)
+        out, _ = self.proc.communicate(timeout=10)
+
+        return out
+
+
+@pytest.fixture(scope="session", autouse=True)
+def fake_gemini():
+
+    server = FakeServer(FAKE_PORT, "--latency", "0.01")
+
+    yield server
+
+    server.stop()
+
+
+@pytest.fixture
+def fake_server_factory():
+
+    servers = []
+
+    def start(*args):
+        server = FakeServer(free_port(), *args)
+        servers.append(server)
+        return server
+
+    yield start
+
+    for server in servers:
+        if server.proc.poll() is None:
+            server.stop()
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+
+    # data/, uploads/ and session/ are relative to the working directory
+    monkeypatch.chdir(tmp_path)
+
+    return tmp_path
@@ -0,0 +1,78 @@
+import os
+import json
+import shutil
+
+import fitz
+
+from core.bulk_ingestion import bulk_ingest
+from core.collection_manager import load_faiss
+from core.upload_store import load_registry
+
+
+def write_pdf(path: str, text: str, pages: int = 2):
+
+    doc = fitz.open()
+
+    for page in range(pages):
+        doc.new_page().insert_text((72, 72), f"{text} page {page + 1}")
+
+    doc.save(path)
+    doc.close()
+
+
+def checkpoint(collection: str):
+
+    with open(os.path.join("data", "collections", collection, "bulk_checkpoint.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_unreadable_pdf_is_skipped_and_not_retried(workdir):
+
+    os.makedirs("pdfs")
+
+    for i in range(3):
+        write_pdf(f"pdfs/good{i}.pdf", f"document {i}")
+
+    with open("pdfs/broken.pdf", "wb") as f:
+        f.write(b"not a pdf at all")
+
+    stats = bulk_ingest("pdfs", workers=2, batch_size=1, collection="bulk")
+
+    assert (stats["files"], stats["chunks"], stats["failed"]) == (3, 6, 1)
+    assert set(checkpoint("bulk")["failed"]) == {"broken.pdf"}
+    assert len(checkpoint("bulk")["done"]) == 3
+
+    # Resuming gets past the broken file instead of failing on it again
+    stats = bulk_ingest("pdfs", workers=2, collection="bulk")
+
+    assert (stats["files"], stats["failed"]) == (0, 0)
+
+    index, store = load_faiss("bulk")
+
+    assert index.ntotal == len(store) == 6
+
+
+def test_resume_ingests_only_new_files_and_dedupes_copies(workdir):
+
+    os.makedirs("pdfs/sub")
+
+    write_pdf("pdfs/a.pdf", "alpha")
+    write_pdf("pdfs/b.pdf", "beta", pages=3)
+
+    bulk_ingest("pdfs", workers=2, collection="bulk")
+
+    # New file plus two copies of an already-indexed one and of the new one
+    write_pdf("pdfs/c.pdf", "gamma")
+    shutil.copy("pdfs/a.pdf", "pdfs/sub/a_copy.pdf")
+    shutil.copy("pdfs/c.pdf", "pdfs/sub/c_copy.pdf")
+
+    stats = bulk_ingest("pdfs", workers=2, collection="bulk")
+
+    assert (stats["files"], stats["chunks"], stats["duplicates"]) == (1, 2, 2)
+
+    index, store = load_faiss("bulk")
+
+    assert index.ntotal == len(store) == 7
+    assert sorted(store.files) == ["a.pdf", "b.pdf", "c.pdf"]
+    assert len(load_registry("bulk")) == 3
+    assert len(checkpoint("bulk")["done"]) == 5
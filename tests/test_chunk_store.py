@@ -0,0 +1,109 @@
+import os
+import threading
+
+import pytest
+
+from core.chunk_store import ChunkStore
+from core.collection_manager import collection_lock, collection_dir
+
+
+def records(prefix: str, n: int):
+
+    return [
+        {"file": f"{prefix}.pdf", "page": i + 1, "chunk_no": i + 1, "content": f"{prefix} chunk {i} " * 40}
+        for i in range(n)
+    ]
+
+
+def test_append_reopen_roundtrip(tmp_path):
+
+    store = ChunkStore(str(tmp_path))
+    store.extend(records("a", 3))
+
+    # Pending records are readable before flush
+    assert len(store) == 3
+    assert store[2]["content"].startswith("a chunk 2")
+
+    store.flush()
+
+    store.extend(records("b", 2))
+    store.flush()
+
+    reopened = ChunkStore(str(tmp_path))
+
+    assert len(reopened) == 5
+    assert reopened[0] == records("a", 3)[0]
+    assert reopened.file_name(4) == "b.pdf"
+    assert reopened.text(3) == records("b", 2)[0]["content"]
+
+
+def test_stale_writer_cannot_flush(tmp_path):
+
+    seed = ChunkStore(str(tmp_path))
+    seed.extend(records("seed", 1))
+    seed.flush()
+
+    first = ChunkStore(str(tmp_path))
+    stale = ChunkStore(str(tmp_path))
+
+    first.extend(records("a", 2))
+    first.flush()
+
+    stale.extend(records("b", 1))
+
+    with pytest.raises(RuntimeError):
+        stale.flush()
+
+    # The seed and the first writer's chunks are untouched
+    reopened = ChunkStore(str(tmp_path))
+
+    assert len(reopened) == 3
+    assert reopened.text(0) == records("seed", 1)[0]["content"]
+    assert reopened.text(2) == records("a", 2)[1]["content"]
+
+
+def test_unpublished_tail_is_dropped(tmp_path):
+
+    store = ChunkStore(str(tmp_path))
+    store.extend(records("a", 2))
+    store.flush()
+
+    # An append that crashed before writing its meta
+    with open(store.text_path, "ab") as f:
+        f.write(b"garbage" * 100)
+
+    store = ChunkStore(str(tmp_path))
+    store.extend(records("b", 1))
+    store.flush()
+
+    reopened = ChunkStore(str(tmp_path))
+
+    assert len(reopened) == 3
+    assert reopened.text(2) == records("b", 1)[0]["content"]
+
+
+def test_concurrent_writers_under_collection_lock(workdir):
+
+    base = collection_dir("locked")
+
+    def writer(prefix):
+        for _ in range(5):
+            with collection_lock("locked"):
+                store = ChunkStore(base)
+                store.extend(records(prefix, 2))
+                store.flush()
+
+    threads = [threading.Thread(target=writer, args=(p,)) for p in "abcd"]
+
+    for t in threads:
+        t.start()
+
+    for t in threads:
+        t.join()
+
+    store = ChunkStore(base)
+
+    assert len(store) == 40
+    assert sorted(store.files) == ["a.pdf", "b.pdf", "c.pdf", "d.pdf"]
+    assert all(store.text(i) for i in range(len(store)))
+    assert os.path.exists(os.path.join(base, ".write.lock"))
@@ -0,0 +1,146 @@
+import os
+import threading
+
+import pytest
+
+import core.collection_manager as collection_manager
+
+from core.collection_manager import (
+    CollectionCache,
+    collection_paths,
+    collection_version,
+    load_faiss,
+    warm_up_collection
+)
+from core.pdf_ingestion import ingest_chunks
+
+from test_migrate_embeddings import write_legacy_collection
+
+
+def chunks_for(name: str, n: int):
+
+    return [(page, f"{name} page {page} " * 30) for page in range(1, n + 1)]
+
+
+def test_cache_evicts_least_recently_used(workdir):
+
+    for name in ("a", "b", "c"):
+        ingest_chunks(chunks_for(name, 3), f"{name}.pdf", name)
+
+    cache = CollectionCache(max_bytes=0)
+    cache.get("a")
+
+    # Room for two collections of this size, not three
+    cache.max_bytes = int(cache.entries["a"]["nbytes"] * 2.5)
+
+    cache.get("b")
+    cache.get("a")
+    cache.get("c")
+
+    assert list(cache.entries) == ["a", "c"]
+    assert cache.total_bytes == sum(e["nbytes"] for e in cache.entries.values())
+
+    # A write bumps the version and the next get reloads
+    ingest_chunks(chunks_for("more", 1), "more.pdf", "a")
+
+    index, store = cache.get("a")
+
+    assert index.ntotal == len(store) == 4
+    assert list(cache.entries) == ["c", "a"]
+
+
+def test_cold_load_does_not_block_loaded_collections(workdir, monkeypatch):
+
+    for name in ("warm", "cold"):
+        ingest_chunks(chunks_for(name, 2), f"{name}.pdf", name)
+
+    cache = CollectionCache(max_bytes=1 << 30)
+    cache.get("warm")
+
+    loading = threading.Event()
+    release = threading.Event()
+    loads = []
+
+    def slow_load(name):
+        loads.append(name)
+        loading.set()
+        release.wait(5)
+        return load_faiss(name)
+
+    monkeypatch.setattr(collection_manager, "load_faiss", slow_load)
+
+    results = []
+
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get("cold")))
+        for _ in range(3)
+    ]
+
+    for t in threads:
+        t.start()
+
+    assert loading.wait(5)
+
+    # Served from the cache while the cold load is still in progress
+    warm = []
+    reader = threading.Thread(target=lambda: warm.append(cache.get("warm")))
+    reader.start()
+    reader.join(1)
+
+    assert warm and warm[0][1].files == ["warm.pdf"]
+
+    release.set()
+
+    for t in threads:
+        t.join()
+
+    # Concurrent misses on one collection share a single load
+    assert loads == ["cold"]
+    assert len({id(index) for index, _ in results}) == 1
+
+
+@pytest.mark.parametrize("mmap", [False, True])
+def test_warm_up_prefaults_only_a_mapped_index(workdir, monkeypatch, mmap):
+
+    ingest_chunks(chunks_for("warm", 2), "warm.pdf", "warm")
+
+    prefaulted = []
+
+    monkeypatch.setattr(collection_manager, "FAISS_MMAP", mmap)
+    monkeypatch.setattr(collection_manager, "prefault_file", prefaulted.append)
+
+    warm_up_collection("warm")
+
+    if mmap:
+        assert [p.rsplit("/", 1)[-1] for p in prefaulted] == ["faiss.index"]
+    else:
+        assert prefaulted == []
+
+
+def test_legacy_pickle_is_migrated_on_first_load(workdir):
+
+    write_legacy_collection("data", 8)
+
+    _, meta_path = collection_paths("pdf_documents")
+
+    # Versioning a legacy collection only stats it
+    version = collection_version("pdf_documents")
+
+    assert version is not None
+    assert not os.path.exists(meta_path)
+
+    index, store = load_faiss("pdf_documents")
+
+    assert os.path.exists(meta_path)
+    assert index.ntotal == len(store) == 8
+    assert store[3]["content"] == "Legacy chunk 3\nabout topic 3"
+    assert store.file_name(7) == "legacy.pdf"
+
+    # Later writes append to the chunk store, not the pickle
+    ingest_chunks(chunks_for("new", 2), "new.pdf", "pdf_documents")
+
+    index, store = load_faiss("pdf_documents")
+
+    assert index.ntotal == len(store) == 10
+    assert store.file_name(9) == "new.pdf"
+    assert collection_version("pdf_documents") != version
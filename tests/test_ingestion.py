@@ -0,0 +1,101 @@
+import threading
+
+import numpy as np
+import pytest
+
+from core.pdf_ingestion import ingest_chunks, ingest_upload
+from core.collection_manager import load_faiss, collection_dir
+from core.sharded_index import ShardedIndex, load_index, save_index, add_vectors
+from core.reshard import reshard_collection, all_vectors
+from core.upload_store import load_registry
+
+
+def chunks_for(name: str, n: int):
+
+    return [(page, f"{name} page {page} " * 30) for page in range(1, n + 1)]
+
+
+def test_concurrent_ingests_keep_index_and_store_aligned(workdir):
+
+    errors = []
+
+    def ingest(i):
+        try:
+            ingest_chunks(chunks_for(f"gen{i}", 3), f"gen{i}.pdf", "race", digest=f"digest{i}")
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=ingest, args=(i,)) for i in range(4)]
+
+    for t in threads:
+        t.start()
+
+    for t in threads:
+        t.join()
+
+    assert not errors
+
+    index, store = load_faiss("race")
+
+    assert index.ntotal == len(store) == 12
+    assert sorted(store.files) == [f"gen{i}.pdf" for i in range(4)]
+    assert sorted(load_registry("race")) == [f"digest{i}" for i in range(4)]
+
+    # Vector i is the embedding of chunk i's text
+    for i in (0, 5, 11):
+        _, ids = index.search(index_vector(index, i)[None, :], 1)
+        assert ids[0][0] == i
+
+
+def test_same_digest_is_only_ingested_once(workdir):
+
+    ingest_chunks(chunks_for("first", 2), "first.pdf", "dup", digest="same")
+
+    assert ingest_chunks(chunks_for("again", 2), "again.pdf", "dup", digest="same") is None
+
+    _, store = load_faiss("dup")
+
+    assert len(store) == 2
+    assert load_registry("dup")["same"] == {"file": "first.pdf", "chunks": 2}
+
+    result = ingest_upload("same", "unused.pdf", "again.pdf", "dup")
+
+    assert result == {"digest": "same", "chunks": 2, "duplicate": True}
+
+
+@pytest.mark.parametrize("num_shards", [1, 3])
+def test_ingest_repairs_an_interrupted_save(workdir, num_shards):
+
+    ingest_chunks(chunks_for("first", 4), "first.pdf", "crash")
+
+    if num_shards > 1:
+        reshard_collection("crash", num_shards)
+
+    # Crash after the index save but before the chunk store flush
+    base = collection_dir("crash")
+    index = load_index(base, mmap=False)
+    add_vectors(index, np.ones((2, index.d), dtype="float32"), ["lost.pdf"] * 2)
+    save_index(index, base)
+
+    assert load_index(base, mmap=False).ntotal == 6
+
+    ingest_chunks(chunks_for("second", 3), "second.pdf", "crash")
+
+    index, store = load_faiss("crash")
+
+    assert index.ntotal == len(store) == 7
+    assert sorted(store.files) == ["first.pdf", "second.pdf"]
+
+    # The new chunks took the dropped ids
+    for i in (3, 4, 6):
+        _, ids = index.search(np.array([index_vector(index, i)]), 1)
+        assert ids[0][0] == i
+
+
+def index_vector(index, i: int):
+
+    if isinstance(index, ShardedIndex):
+        vectors = all_vectors(index)
+        return vectors[i]
+
+    return index.reconstruct(i)
@@ -0,0 +1,60 @@
+import os
+import json
+import pickle
+
+import faiss
+import numpy as np
+
+from core.migrate_embeddings import migrate_collection
+from core.collection_manager import collection_dim, load_faiss
+
+from conftest import TEST_DIM
+
+
+def write_legacy_collection(directory: str, n: int):
+
+    # The pre-chunk-store layout that ships in data/: faiss.index + metadata.pkl
+    os.makedirs(directory, exist_ok=True)
+
+    index = faiss.IndexFlatL2(TEST_DIM)
+    index.add(np.random.default_rng(0).standard_normal((n, TEST_DIM), dtype=np.float32))
+    faiss.write_index(index, os.path.join(directory, "faiss.index"))
+
+    metadata = [
+        {"id": str(i), "file": "legacy.pdf", "page": i + 1, "chunk_no": i + 1,
+         "content": f"Legacy chunk {i}\nabout topic {i}"}
+        for i in range(n)
+    ]
+
+    with open(os.path.join(directory, "metadata.pkl"), "wb") as f:
+        pickle.dump(metadata, f)
+
+
+def test_migrates_a_pickle_backed_collection(workdir):
+
+    write_legacy_collection("data", 8)
+
+    report = migrate_collection("pdf_documents", dim=32, sample=4, top_k=3, workers=2)
+
+    assert report["applied"]
+    assert (report["old_dim"], report["new_dim"]) == (TEST_DIM, 32)
+
+    with open(os.path.join("data", "migration_report.json"), encoding="utf-8") as f:
+        assert json.load(f)["new_dim"] == 32
+
+    index, store = load_faiss("pdf_documents")
+
+    assert collection_dim("pdf_documents") == 32
+    assert index.ntotal == len(store) == 8
+    assert store.text(3) == "Legacy chunk 3\nabout topic 3"
+    assert os.path.exists(os.path.join("data", f"index.{TEST_DIM}.bak", "faiss.index"))
+
+
+def test_dry_run_keeps_the_index(workdir):
+
+    write_legacy_collection("data", 4)
+
+    report = migrate_collection("pdf_documents", dim=32, sample=2, top_k=2, workers=2, dry_run=True)
+
+    assert not report["applied"]
+    assert collection_dim("pdf_documents") == TEST_DIM
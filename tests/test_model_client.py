@@ -0,0 +1,130 @@
+import ast
+import asyncio
+import threading
+import time
+
+import numpy as np
+
+from concurrent.futures import ThreadPoolExecutor
+
+from core.model_client import ModelClient, AdaptiveConcurrency
+
+from conftest import TEST_DIM
+
+
+def server_stats(server):
+
+    line = [l for l in server.stop().splitlines() if l.startswith("📊")][-1]
+
+    return ast.literal_eval(line.split(" ", 1)[1])
+
+
+def test_embed_retries_through_throttling(fake_server_factory):
+
+    server = fake_server_factory("--throttle", "0.3", "--latency", "0.01")
+
+    client = ModelClient(base_url=server.url, api_key="test", embed_rpm=6000, max_retries=10)
+
+    texts = [f"text {i}" for i in range(30)]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        sync_vectors = list(executor.map(lambda t: client.embed(t, TEST_DIM), texts))
+
+    async def embed_all():
+        return await asyncio.gather(*[client.aembed(t, TEST_DIM) for t in texts])
+
+    async_vectors = asyncio.run(embed_all())
+
+    for vectors in (sync_vectors, async_vectors):
+        assert all(v.shape == (TEST_DIM,) for v in vectors)
+        assert all(abs(np.linalg.norm(v) - 1) < 1e-5 for v in vectors)
+
+    # Same text, same vector, whichever path embedded it
+    np.testing.assert_allclose(sync_vectors[3], async_vectors[3], rtol=1e-5)
+
+    stats = server_stats(server)
+
+    assert stats["ok"] == 60
+    assert stats["throttled"] > 0
+
+    # Throttling pulled the AIMD limit down and every slot was returned
+    assert client.concurrency.in_flight == 0
+    assert not client.concurrency.waiters
+
+
+def test_concurrency_slots_are_fifo_across_threads_and_coroutines():
+
+    limit = AdaptiveConcurrency(initial=1, maximum=1)
+    order = []
+
+    def thread_worker(i):
+        limit.enter()
+        order.append(f"t{i}")
+        time.sleep(0.02)
+        limit.leave()
+
+    async def main():
+
+        async def coro_worker(i):
+            await limit.aenter()
+            order.append(f"a{i}")
+            await asyncio.sleep(0.02)
+            limit.leave()
+
+        threads = []
+        tasks = []
+
+        for i in range(3):
+
+            threads.append(threading.Thread(target=thread_worker, args=(i,)))
+            threads[-1].start()
+            await asyncio.sleep(0.005)
+
+            tasks.append(asyncio.ensure_future(coro_worker(i)))
+            await asyncio.sleep(0.005)
+
+        await asyncio.gather(*tasks)
+
+        for t in threads:
+            t.join()
+
+    asyncio.run(main())
+
+    assert order == ["t0", "a0", "t1", "a1", "t2", "a2"]
+    assert limit.in_flight == 0
+
+
+def test_cancelled_waiter_releases_its_place():
+
+    limit = AdaptiveConcurrency(initial=1, maximum=1)
+
+    async def main():
+
+        await limit.aenter()
+
+        queued = asyncio.ensure_future(limit.aenter())
+        await asyncio.sleep(0.01)
+
+        queued.cancel()
+        await asyncio.gather(queued, return_exceptions=True)
+
+        limit.leave()
+
+        # The slot is free again, not held by the cancelled waiter
+        await asyncio.wait_for(limit.aenter(), 1)
+        limit.leave()
+
+    asyncio.run(main())
+
+    assert limit.in_flight == 0
+    assert not limit.waiters
+
+
+def test_throttling_halves_the_limit():
+
+    limit = AdaptiveConcurrency(initial=8, maximum=16)
+
+    limit.enter()
+    limit.leave(throttled=True)
+
+    assert limit.limit == 4
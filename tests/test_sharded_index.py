@@ -0,0 +1,122 @@
+import faiss
+import numpy as np
+import pytest
+
+from core.sharded_index import (
+    ShardedIndex,
+    create_index,
+    add_vectors,
+    save_index,
+    load_index,
+    index_dim,
+    is_sharded,
+    shard_of,
+    write_shard
+)
+
+
+DIM = 32
+
+
+def dataset(n: int = 2000, queries: int = 20):
+
+    rng = np.random.default_rng(0)
+
+    vectors = rng.standard_normal((n, DIM), dtype=np.float32)
+    files = [f"doc{i % 37}.pdf" for i in range(n)]
+
+    return vectors, files, rng.standard_normal((queries, DIM), dtype=np.float32)
+
+
+@pytest.mark.parametrize("shard_by", ["hash", "document"])
+def test_sharded_search_matches_flat(shard_by):
+
+    vectors, files, queries = dataset()
+
+    flat = faiss.IndexFlatL2(DIM)
+    flat.add(vectors)
+
+    sharded = create_index(DIM, 4, shard_by)
+    add_vectors(sharded, vectors[:1500], files[:1500])
+    add_vectors(sharded, vectors[1500:], files[1500:])
+
+    assert isinstance(sharded, ShardedIndex)
+    assert sharded.ntotal == flat.ntotal
+
+    expected_d, expected_i = flat.search(queries, 10)
+    found_d, found_i = sharded.search(queries, 10)
+
+    np.testing.assert_array_equal(found_i, expected_i)
+    np.testing.assert_allclose(found_d, expected_d, rtol=1e-5)
+
+
+def test_top_k_larger_than_index_pads_with_minus_one():
+
+    sharded = create_index(DIM, 3)
+    add_vectors(sharded, np.eye(DIM, dtype=np.float32)[:2], ["a.pdf", "b.pdf"])
+
+    _, ids = sharded.search(np.zeros((1, DIM), dtype=np.float32), 5)
+
+    assert sorted(ids[0][:2]) == [0, 1]
+    assert list(ids[0][2:]) == [-1, -1, -1]
+
+
+def test_save_load_and_rebuild_one_shard(tmp_path):
+
+    vectors, files, queries = dataset(600)
+
+    sharded = create_index(DIM, 3, "document")
+    add_vectors(sharded, vectors, files)
+    save_index(sharded, str(tmp_path))
+
+    assert is_sharded(str(tmp_path))
+    assert index_dim(str(tmp_path)) == DIM
+
+    expected = sharded.search(queries, 5)[1]
+
+    # Rewrite shard 1 from the source vectors alone
+    ids = [i for i in range(len(files)) if shard_of(i, files[i], 3, "document") == 1]
+    write_shard(str(tmp_path), 1, vectors[ids], ids)
+
+    loaded = load_index(str(tmp_path), mmap=False)
+
+    assert loaded.ntotal == 600
+    np.testing.assert_array_equal(loaded.search(queries, 5)[1], expected)
+
+
+def test_single_file_layout_replaces_shards(tmp_path):
+
+    vectors, files, _ = dataset(100)
+
+    sharded = create_index(DIM, 2)
+    add_vectors(sharded, vectors, files)
+    save_index(sharded, str(tmp_path))
+
+    flat = create_index(DIM, 1)
+    add_vectors(flat, vectors, files)
+    save_index(flat, str(tmp_path))
+
+    assert not is_sharded(str(tmp_path))
+    assert index_dim(str(tmp_path)) == DIM
+    assert load_index(str(tmp_path), mmap=False).ntotal == 100
+
+
+@pytest.mark.parametrize("num_shards", [1, 3])
+def test_mmap_load_matches_in_memory_load(tmp_path, num_shards):
+
+    vectors, files, queries = dataset(500)
+
+    index = create_index(DIM, num_shards)
+    add_vectors(index, vectors, files)
+    save_index(index, str(tmp_path))
+
+    in_memory = load_index(str(tmp_path), mmap=False)
+    mapped = load_index(str(tmp_path), mmap=True)
+
+    assert mapped.ntotal == in_memory.ntotal == 500
+
+    expected_d, expected_i = in_memory.search(queries, 10)
+    found_d, found_i = mapped.search(queries, 10)
+
+    np.testing.assert_array_equal(found_i, expected_i)
+    np.testing.assert_allclose(found_d, expected_d, rtol=1e-5)
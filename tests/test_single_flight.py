@@ -0,0 +1,146 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from core.single_flight import SingleFlight
+
+
+def test_do_coalesces_concurrent_calls():
+
+    group = SingleFlight("test")
+    runs = []
+    release = threading.Event()
+
+    def work():
+        runs.append(1)
+        release.wait(5)
+        return object()
+
+    results = []
+
+    threads = [
+        threading.Thread(target=lambda: results.append(group.do("k", work)))
+        for _ in range(8)
+    ]
+
+    for t in threads:
+        t.start()
+
+    # Every caller is either running or waiting before the leader finishes
+    while group.stats["calls"] < 8:
+        time.sleep(0.01)
+
+    release.set()
+
+    for t in threads:
+        t.join()
+
+    assert len(runs) == 1
+    assert len({id(r) for r in results}) == 1
+    assert group.stats == {"calls": 8, "executions": 1, "coalesced": 7}
+
+
+def test_do_shares_errors_and_keeps_nothing():
+
+    group = SingleFlight("test")
+    started = threading.Event()
+    release = threading.Event()
+
+    def fail():
+        started.set()
+        release.wait(5)
+        raise ValueError("boom")
+
+    errors = []
+
+    def call():
+        try:
+            group.do("k", fail)
+        except ValueError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait(5)
+
+    follower = threading.Thread(target=call)
+    follower.start()
+
+    while group.stats["calls"] < 2:
+        time.sleep(0.01)
+
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert len(errors) == 2
+
+    # Not a cache: the next call runs again
+    assert group.do("k", lambda: 42) == 42
+    assert group.stats["executions"] == 2
+
+
+def test_ado_coalesces_and_survives_one_waiter_cancelling():
+
+    group = SingleFlight("test")
+    runs = []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.1)
+        return "answer"
+
+    async def main():
+
+        first = asyncio.ensure_future(group.ado("k", work))
+        second = asyncio.ensure_future(group.ado("k", work))
+
+        await asyncio.sleep(0.01)
+        first.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+        return await second
+
+    assert asyncio.run(main()) == "answer"
+    assert len(runs) == 1
+    assert group.stats["coalesced"] == 1
+
+
+def test_ado_last_waiter_cancelling_stops_the_work():
+
+    group = SingleFlight("test")
+    cancelled = []
+
+    async def work():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+        return "stale"
+
+    async def quick():
+        return "fresh"
+
+    async def main():
+
+        waiter = asyncio.ensure_future(group.ado("k", work))
+
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        # A new caller starts its own execution instead of joining the
+        # cancelled one
+        return await group.ado("k", quick)
+
+    assert asyncio.run(main()) == "fresh"
+    assert cancelled == [1]
+    assert group.stats["executions"] == 2
+    assert not group.tasks
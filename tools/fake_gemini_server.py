@@ -0,0 +1,191 @@
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# =====================================================
+# FAKE GEMINI SERVER
+# =====================================================
+#
+# Minimal stand-in for the Gemini REST API, used to exercise
+# core.model_client under throttling without spending quota:
+#
+#   python tools/fake_gemini_server.py --rpm 120 --throttle 0.1
+#   GEMINI_BASE_URL=http://127.0.0.1:8765 python -m core.bulk_ingestion uploads
+#
+# Requests over the per-minute quota (or picked at random with
+# --throttle) get a 429; --errors injects random 503s.
+
+
+def collect_texts(node, out):
+
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key == "text" and isinstance(value, str):
+                out.append(value)
+            else:
+                collect_texts(value, out)
+
+    elif isinstance(node, list):
+        for item in node:
+            collect_texts(item, out)
+
+    return out
+
+
+def find_key(node, key):
+
+    if isinstance(node, dict):
+        if key in node:
+            return node[key]
+        node = list(node.values())
+
+    if isinstance(node, list):
+        for item in node:
+            found = find_key(item, key)
+            if found is not None:
+                return found
+
+    return None
+
+
+def fake_vector(text: str, dim: int):
+
+    # Deterministic per text, so repeated runs give the same index
+    rng = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+
+    return [rng.uniform(-1, 1) for _ in range(dim)]
+
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+
+    settings = None
+    window = deque()
+    stats = {"ok": 0, "throttled": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def send_json(self, status: int, payload):
+
+        body = json.dumps(payload).encode("utf-8")
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def over_quota(self) -> bool:
+
+        now = time.monotonic()
+
+        with self.lock:
+
+            while self.window and now - self.window[0] > 60:
+                self.window.popleft()
+
+            if self.settings.rpm and len(self.window) >= self.settings.rpm:
+                return True
+
+            self.window.append(now)
+
+            return False
+
+    def do_POST(self):
+
+        settings = self.settings
+
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+
+        time.sleep(settings.latency)
+
+        if self.over_quota() or random.random() < settings.throttle:
+            self.stats["throttled"] += 1
+            return self.send_json(429, {"error": {
+                "code": 429,
+                "message": "Resource has been exhausted (fake quota).",
+                "status": "RESOURCE_EXHAUSTED"
+            }})
+
+        if random.random() < settings.errors:
+            self.stats["errors"] += 1
+            return self.send_json(503, {"error": {
+                "code": 503,
+                "message": "The model is overloaded (fake).",
+                "status": "UNAVAILABLE"
+            }})
+
+        texts = collect_texts(payload, [])
+
+        # Honour outputDimensionality like the real endpoint (prefix of full vector)
+        dim = min(find_key(payload, "outputDimensionality") or settings.dim, settings.dim)
+
+        self.stats["ok"] += 1
+
+        if self.path.endswith(":batchEmbedContents"):
+            return self.send_json(200, {"embeddings": [
+                {"values": fake_vector(text, settings.dim)[:dim]} for text in texts
+            ]})
+
+        if self.path.endswith(":embedContent"):
+            return self.send_json(200, {"embedding": {
+                "values": fake_vector(" ".join(texts), settings.dim)[:dim]
+            }})
+
+        if self.path.endswith(":generateContent"):
+            return self.send_json(200, {"candidates": [{
+                "content": {
+                    "role": "model",
+                    "parts": [{"text": "Fake answer from the local test server."}]
+                },
+                "finishReason": "STOP"
+            }]})
+
+        return self.send_json(404, {"error": {
+            "code": 404,
+            "message": f"Unknown path {self.path}",
+            "status": "NOT_FOUND"
+        }})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Fake Gemini API with injected throttling.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rpm", type=int, default=0, help="Per-minute quota (0 = unlimited)")
+    parser.add_argument("--throttle", type=float, default=0.0, help="Random 429 probability")
+    parser.add_argument("--errors", type=float, default=0.0, help="Random 503 probability")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per request")
+    parser.add_argument("--dim", type=int, default=3072)
+
+    FakeGeminiHandler.settings = parser.parse_args(argv)
+
+    server = ThreadingHTTPServer((FakeGeminiHandler.settings.host,
+                                  FakeGeminiHandler.settings.port),
+                                 FakeGeminiHandler)
+
+    print(f"🧪 Fake Gemini server on http://{server.server_address[0]}:{server.server_address[1]}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+    print(f"📊 {FakeGeminiHandler.stats}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())